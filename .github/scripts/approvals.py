@@ -0,0 +1,119 @@
+import json
+import re
+
+import gh_client
+from records import Comment
+
+# The tally lives in a hidden block inside the bot's review comment:
+#   <!-- join-bot:approvals {"approved": [...], "since": "..."} -->
+STATE_RE = re.compile(r"<!-- join-bot:approvals (\{.*?\}) -->", re.S)
+
+def render_state(state):
+    return f"<!-- join-bot:approvals {json.dumps(state, sort_keys=True)} -->"
+
+def parse_state(body):
+    m = STATE_RE.search(body or "")
+    if not m:
+        return None
+    try:
+        state = json.loads(m.group(1))
+    except ValueError:
+        return None
+    return {"approved": list(state.get("approved") or []), "since": state.get("since") or ""}
+
+def with_state(body, state):
+    """Return `body` with its state block replaced (or appended)"""
+    block = render_state(state)
+    if STATE_RE.search(body or ""):
+        return STATE_RE.sub(lambda _: block, body)
+    return f"{body}\n\n{block}" if body else block
+
+def is_state_comment(cmt):
+    # Only the bot may carry the tally; a user pasting the marker is ignored
+    return cmt.author_type == "Bot" and parse_state(cmt.body) is not None
+
+class ApprovalTally:
+    """Reviewer sets for one target and the /approve counting rules.
+
+    `target` is a join_config.Target, whose reviewer logins are compiled
+    with the config; only the team rosters come from the snapshot.
+    """
+
+    def __init__(self, target, members):
+        self.reviewer_users = target.reviewer_users
+        self.reviewer_teams = target.reviewer_teams
+        self.required = target.reviewer_logins
+        team_members = set()
+        for team in target.reviewer_teams:
+            team_members.update(members.team_members(team))
+        # Only count as team approval if not already a required user
+        self.team_reviewers = frozenset(team_members - self.required)
+        self.authorized = self.required | self.team_reviewers
+
+    def is_authorized(self, login):
+        return bool(login) and login.lower() in self.authorized
+
+    def apply(self, comments, approved):
+        """Add authorized /approve comments to `approved`; returns the newest
+        `updated_at` seen, which is where the next tally can resume"""
+        latest = ""
+        for cmt in comments:
+            if is_state_comment(cmt):
+                continue
+            latest = max(latest, cmt.updated_at or cmt.created_at)
+            if cmt.body.strip().lower() == "/approve" and self.is_authorized(cmt.author):
+                approved.add(cmt.author.lower())
+        return latest
+
+    def missing_users(self, approved):
+        return [u for u in self.reviewer_users if u.lower() not in approved]
+
+    def team_approved(self, approved):
+        return not self.reviewer_teams or bool(self.team_reviewers & approved)
+
+def comments_path(repo, issue_number, since=""):
+    path = f"repos/{repo}/issues/{issue_number}/comments?per_page=100"
+    return f"{path}&since={since}" if since else path
+
+def find_state_comment(token, repo, issue_number, user_agent="join-org-action"):
+    """Locate the bot comment holding the tally. It is posted when the issue
+    opens, so this normally stops on the first page."""
+    for cmt in gh_client.paginate(comments_path(repo, issue_number), token, user_agent=user_agent,
+                                  project=Comment.from_json):
+        if is_state_comment(cmt):
+            return cmt
+    return None
+
+def update_tally(token, repo, issue_number, tally, actor, comments=None, user_agent="join-org-action"):
+    """Bring the persisted tally up to date and return the approved logins.
+
+    Only comments updated since the last tally are read (via `since`); the
+    whole thread is read once when no tally exists yet. `comments`, when the
+    caller already has the full thread (e.g. from GraphQL), skips the reads.
+    """
+    state_cmt = None
+    if comments is not None:
+        state_cmt = next((c for c in comments if is_state_comment(c)), None)
+    else:
+        state_cmt = find_state_comment(token, repo, issue_number, user_agent=user_agent)
+    state = parse_state(state_cmt.body) if state_cmt else None
+
+    approved = {a.lower() for a in (state or {}).get("approved", []) if tally.is_authorized(a)}
+    since = (state or {}).get("since", "")
+    if comments is None:
+        comments = gh_client.paginate(comments_path(repo, issue_number, since), token, user_agent=user_agent,
+                                      project=Comment.from_json)
+    latest = tally.apply(comments, approved)
+    # Always count the current actor (the event's own comment may not be listed yet)
+    if tally.is_authorized(actor):
+        approved.add(actor.lower())
+
+    new_state = {"approved": sorted(approved), "since": max(since, latest)}
+    if state != new_state:
+        if state_cmt:
+            gh_client.gh("PATCH", f"repos/{repo}/issues/comments/{state_cmt.id}", token,
+                         {"body": with_state(state_cmt.body, new_state)}, user_agent=user_agent)
+        else:
+            gh_client.gh("POST", f"repos/{repo}/issues/{issue_number}/comments", token,
+                         {"body": with_state("审批进度", new_state)}, user_agent=user_agent)
+    return approved
@@ -0,0 +1,559 @@
+"""A local stand-in for the parts of the GitHub REST and GraphQL APIs the
+join scripts use, with configurable latency, page size and rate limits.
+
+Every call is counted per endpoint template so a benchmark can report what
+a run cost. State lives in memory; seed() fills it with synthetic data.
+"""
+import gzip
+import hashlib
+import json
+import random
+import re
+import socket
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BOT_LOGIN = "join-bot[bot]"
+
+def iso(t=None):
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() if t is None else t))
+
+class MockGitHub:
+    def __init__(self, org="bench-org", repo="bench-org/members", latency=0.0, per_page_max=100,
+                 rate_limit=0, secondary_every=0, error_every=0):
+        self.org = org
+        self.repo = repo
+        self.latency = latency
+        self.per_page_max = per_page_max
+        self.rate_limit = rate_limit
+        self.secondary_every = secondary_every
+        self.error_every = error_every
+        self.base = ""
+        self.lock = threading.RLock()
+
+        self.users = {}
+        self.org_members = set()
+        self.invitations = {}
+        self.failed_invitations = {}
+        self.teams = {}
+        self.issues = {}
+        self.comments = {}
+        self.next_id = 1000
+
+        self.calls = Counter()
+        self.statuses = Counter()
+        self.remaining = rate_limit
+        self.reset_at = time.time() + 3600
+        self.writes = 0
+        self.requests = 0
+
+    # --- data ---------------------------------------------------------
+
+    def new_id(self):
+        self.next_id += 1
+        return self.next_id
+
+    def user(self, login, kind="User"):
+        with self.lock:
+            if login.lower() not in self.users:
+                self.users[login.lower()] = {"login": login, "id": self.new_id(), "type": kind}
+            return self.users[login.lower()]
+
+    def team(self, slug):
+        return self.teams.setdefault(slug, {"members": set(), "pending": set()})
+
+    def add_issue(self, author, labels, body=""):
+        with self.lock:
+            number = len(self.issues) + 1
+            now = iso()
+            self.issues[number] = {
+                "number": number,
+                "title": f"[Join] @{author}",
+                "body": body,
+                "user": {"login": self.user(author)["login"], "type": "User"},
+                "labels": [{"name": l} for l in labels],
+                "assignees": [],
+                "state": "open",
+                "created_at": now,
+                "updated_at": now,
+                "comment_ids": [],
+            }
+            return number
+
+    def add_comment(self, number, login, body, kind="User"):
+        with self.lock:
+            now = iso()
+            cid = self.new_id()
+            self.comments[cid] = {
+                "id": cid,
+                "issue_number": number,
+                "body": body,
+                "user": {"login": login, "type": kind},
+                "created_at": now,
+                "updated_at": now,
+            }
+            self.issues[number]["comment_ids"].append(cid)
+            self.issues[number]["updated_at"] = now
+            return self.comments[cid]
+
+    def seed(self, issues=100, members=200, team_size=20, comments=3, approval_share=0.3,
+             accepted_share=0.4, invited_share=0.3, expired_share=0.0, reviewer="sunrisepeak", seed=1):
+        """Fill the org, teams and issue tracker with synthetic join requests.
+
+        Team slugs match .github/join-config.yml: `members`, `vteam` and the
+        `coreteam` reviewers, with `reviewer` as the required approver.
+        """
+        rnd = random.Random(seed)
+        with self.lock:
+            self.user(BOT_LOGIN, "Bot")
+            for i in range(members):
+                login = self.user(f"member-{i}")["login"]
+                self.org_members.add(login.lower())
+                self.team("members")["members"].add(login.lower())
+            for i in range(team_size):
+                self.team("coreteam")["members"].add(f"member-{i}")
+                self.team("vteam")["members"].add(f"member-{i + team_size}")
+            self.user(reviewer)
+            self.org_members.add(reviewer.lower())
+            self.team("coreteam")["members"].add(reviewer.lower())
+
+            for i in range(issues):
+                login = self.user(f"applicant-{i}")["login"]
+                target = "vteam" if rnd.random() < approval_share else "members"
+                labels = ["join-request", f"target:{target}"]
+                roll = rnd.random()
+                if roll < accepted_share:
+                    self.org_members.add(login.lower())
+                    labels.append("invited")
+                elif roll < accepted_share + invited_share:
+                    self.invitations[login.lower()] = self.invitation(login)
+                    labels.append("invited")
+                elif roll < accepted_share + invited_share + expired_share:
+                    self.failed_invitations[login.lower()] = dict(self.invitation(login),
+                                                                  failed_at=iso(), failed_reason="Invitation expired")
+                    labels.append("invited")
+                number = self.add_issue(login, labels)
+                if target == "vteam":
+                    self.add_comment(number, BOT_LOGIN,
+                                     '**该申请需要审核**\n\n<!-- join-bot:approvals {"approved": [], "since": ""} -->', "Bot")
+                for c in range(comments):
+                    self.add_comment(number, login if c % 2 == 0 else f"member-{rnd.randrange(members or 1)}",
+                                     f"comment {c}")
+                if target == "vteam":
+                    self.add_comment(number, f"member-{rnd.randrange(team_size or 1)}", "/approve")
+        return self
+
+    def invitation(self, login):
+        user = self.user(login)
+        return {"id": self.new_id(), "login": user["login"], "invitee_id": user["id"], "created_at": iso(),
+                "role": "direct_member"}
+
+    # --- HTTP plumbing ------------------------------------------------
+
+    ROUTES = [
+        ("GET", r"/repos/([^/]+/[^/]+)/issues", "/repos/{repo}/issues", "list_issues"),
+        ("GET", r"/repos/([^/]+/[^/]+)/issues/(\d+)", "/repos/{repo}/issues/{n}", "get_issue"),
+        ("PATCH", r"/repos/([^/]+/[^/]+)/issues/(\d+)", "/repos/{repo}/issues/{n}", "patch_issue"),
+        ("GET", r"/repos/([^/]+/[^/]+)/issues/(\d+)/comments", "/repos/{repo}/issues/{n}/comments", "list_comments"),
+        ("POST", r"/repos/([^/]+/[^/]+)/issues/(\d+)/comments", "/repos/{repo}/issues/{n}/comments", "post_comment"),
+        ("PATCH", r"/repos/([^/]+/[^/]+)/issues/comments/(\d+)", "/repos/{repo}/issues/comments/{id}", "patch_comment"),
+        ("POST", r"/repos/([^/]+/[^/]+)/issues/(\d+)/labels", "/repos/{repo}/issues/{n}/labels", "add_labels"),
+        ("DELETE", r"/repos/([^/]+/[^/]+)/issues/(\d+)/labels/([^/]+)", "/repos/{repo}/issues/{n}/labels/{name}", "remove_label"),
+        ("POST", r"/repos/([^/]+/[^/]+)/issues/(\d+)/assignees", "/repos/{repo}/issues/{n}/assignees", "add_assignees"),
+        ("GET", r"/repos/([^/]+/[^/]+)/issues/(\d+)/events", "/repos/{repo}/issues/{n}/events", "list_events"),
+        ("GET", r"/search/issues", "/search/issues", "search_issues"),
+        ("GET", r"/orgs/([^/]+)/members", "/orgs/{org}/members", "list_members"),
+        ("GET", r"/orgs/([^/]+)/members/([^/]+)", "/orgs/{org}/members/{user}", "check_member"),
+        ("GET", r"/orgs/([^/]+)/invitations", "/orgs/{org}/invitations", "list_invitations"),
+        ("POST", r"/orgs/([^/]+)/invitations", "/orgs/{org}/invitations", "create_invitation"),
+        ("GET", r"/orgs/([^/]+)/failed_invitations", "/orgs/{org}/failed_invitations", "list_failed_invitations"),
+        ("GET", r"/orgs/([^/]+)/teams/([^/]+)/members", "/orgs/{org}/teams/{slug}/members", "list_team_members"),
+        ("GET", r"/orgs/([^/]+)/teams/([^/]+)/invitations", "/orgs/{org}/teams/{slug}/invitations", "list_team_invitations"),
+        ("GET", r"/orgs/([^/]+)/teams/([^/]+)/memberships/([^/]+)", "/orgs/{org}/teams/{slug}/memberships/{user}", "get_team_membership"),
+        ("PUT", r"/orgs/([^/]+)/teams/([^/]+)/memberships/([^/]+)", "/orgs/{org}/teams/{slug}/memberships/{user}", "put_team_membership"),
+        ("GET", r"/users/([^/]+)", "/users/{user}", "get_user"),
+        ("POST", r"/graphql", "/graphql", "graphql"),
+    ]
+    ROUTES = [(m, re.compile(f"^{p}$"), t, h) for m, p, t, h in ROUTES]
+
+    def route(self, method, path):
+        for m, pattern, template, handler in self.ROUTES:
+            if m == method:
+                match = pattern.match(path)
+                if match:
+                    return template, getattr(self, handler), match.groups()
+        return f"{method} ?", None, ()
+
+    def rate_headers(self, resource):
+        if not self.rate_limit:
+            return {}
+        return {
+            "X-RateLimit-Limit": str(self.rate_limit),
+            "X-RateLimit-Remaining": str(max(0, self.remaining)),
+            "X-RateLimit-Reset": str(int(self.reset_at)),
+            "X-RateLimit-Resource": resource,
+        }
+
+    def handle(self, method, raw_path, headers, body):
+        """Returns (status, payload, extra headers)"""
+        if self.latency:
+            time.sleep(self.latency)
+        url = urllib.parse.urlsplit(raw_path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        template, handler, args = self.route(method, url.path)
+        resource = "graphql" if template == "/graphql" else "search" if template.startswith("/search") else "core"
+        with self.lock:
+            self.calls[f"{method} {template}"] += 1
+            if self.rate_limit:
+                if time.time() >= self.reset_at:
+                    self.remaining, self.reset_at = self.rate_limit, time.time() + 3600
+                if self.remaining <= 0:
+                    return 403, {"message": "API rate limit exceeded"}, self.rate_headers(resource)
+                self.remaining -= 1
+            if method != "GET" and template != "/graphql":
+                self.writes += 1
+                if self.secondary_every and self.writes % self.secondary_every == 0:
+                    return 429, {"message": "You have exceeded a secondary rate limit."}, {"Retry-After": "1"}
+            self.requests += 1
+            fail = bool(self.error_every) and self.requests % self.error_every == 0
+        if handler is None:
+            return 404, {"message": "Not Found"}, {}
+        if fail and method == "GET":
+            return 502, {"message": "Server Error"}, {}
+        with self.lock:
+            status, payload, extra = handler(query, body, *args)
+        if fail:
+            # The worst case for writes: applied, but the answer is lost
+            return 502, {"message": "Server Error"}, {}
+        extra = dict(extra or {})
+        extra.update(self.rate_headers(resource))
+        return status, payload, extra
+
+    def page(self, items, query, path):
+        per_page = min(int(query.get("per_page", 30)), self.per_page_max)
+        page = int(query.get("page", 1))
+        start = (page - 1) * per_page
+        extra = {}
+        if start + per_page < len(items):
+            q = dict(query, page=str(page + 1), per_page=str(per_page))
+            extra["Link"] = f'<{self.base}{path}?{urllib.parse.urlencode(q)}>; rel="next"'
+        return items[start:start + per_page], extra
+
+    # --- REST handlers ------------------------------------------------
+
+    def issue_json(self, issue):
+        out = {k: v for k, v in issue.items() if k != "comment_ids"}
+        out["comments"] = len(issue["comment_ids"])
+        return out
+
+    def list_issues(self, query, body, repo):
+        labels = [l for l in query.get("labels", "").split(",") if l]
+        state = query.get("state", "open")
+        since = query.get("since", "")
+        items = []
+        for issue in self.issues.values():
+            names = {l["name"] for l in issue["labels"]}
+            if any(l not in names for l in labels):
+                continue
+            if state != "all" and issue["state"] != state:
+                continue
+            if since and issue["updated_at"] < since:
+                continue
+            items.append(issue)
+        key = "updated_at" if query.get("sort") == "updated" else "created_at"
+        items.sort(key=lambda i: (i[key], i["number"]), reverse=query.get("direction", "desc") == "desc")
+        page, extra = self.page([self.issue_json(i) for i in items], query, f"/repos/{repo}/issues")
+        return 200, page, extra
+
+    def search_issues(self, query, body):
+        q = query.get("q", "")
+        label = re.search(r"label:(\S+)", q)
+        items = [self.issue_json(i) for i in self.issues.values()
+                 if i["state"] == "open" and (not label or label.group(1) in {l["name"] for l in i["labels"]})]
+        page, extra = self.page(items[:1000], query, "/search/issues")
+        return 200, {"total_count": len(items), "items": page}, extra
+
+    def get_issue(self, query, body, repo, n):
+        issue = self.issues.get(int(n))
+        if not issue:
+            return 404, {"message": "Not Found"}, {}
+        return 200, self.issue_json(issue), {}
+
+    def patch_issue(self, query, body, repo, n):
+        issue = self.issues.get(int(n))
+        if not issue:
+            return 404, {"message": "Not Found"}, {}
+        if "state" in body:
+            issue["state"] = body["state"]
+        if "labels" in body:
+            issue["labels"] = [{"name": l} for l in body["labels"]]
+        if "assignees" in body:
+            issue["assignees"] = [{"login": a} for a in body["assignees"]]
+        if "body" in body:
+            issue["body"] = body["body"]
+        issue["updated_at"] = iso()
+        return 200, self.issue_json(issue), {}
+
+    def list_comments(self, query, body, repo, n):
+        issue = self.issues.get(int(n))
+        if not issue:
+            return 404, {"message": "Not Found"}, {}
+        since = query.get("since", "")
+        items = [self.comments[c] for c in issue["comment_ids"] if self.comments[c]["updated_at"] >= since]
+        page, extra = self.page(items, query, f"/repos/{repo}/issues/{n}/comments")
+        return 200, page, extra
+
+    def post_comment(self, query, body, repo, n):
+        if int(n) not in self.issues:
+            return 404, {"message": "Not Found"}, {}
+        return 201, self.add_comment(int(n), BOT_LOGIN, body.get("body", ""), "Bot"), {}
+
+    def patch_comment(self, query, body, repo, cid):
+        cmt = self.comments.get(int(cid))
+        if not cmt:
+            return 404, {"message": "Not Found"}, {}
+        cmt["body"] = body.get("body", cmt["body"])
+        cmt["updated_at"] = iso()
+        self.issues[cmt["issue_number"]]["updated_at"] = cmt["updated_at"]
+        return 200, cmt, {}
+
+    def add_labels(self, query, body, repo, n):
+        issue = self.issues.get(int(n))
+        if not issue:
+            return 404, {"message": "Not Found"}, {}
+        names = [l["name"] for l in issue["labels"]]
+        names += [l for l in body.get("labels", []) if l not in names]
+        issue["labels"] = [{"name": l} for l in names]
+        issue["updated_at"] = iso()
+        return 200, issue["labels"], {}
+
+    def remove_label(self, query, body, repo, n, name):
+        issue = self.issues.get(int(n))
+        if not issue:
+            return 404, {"message": "Not Found"}, {}
+        name = urllib.parse.unquote(name)
+        issue["labels"] = [l for l in issue["labels"] if l["name"] != name]
+        issue["updated_at"] = iso()
+        return 200, issue["labels"], {}
+
+    def add_assignees(self, query, body, repo, n):
+        issue = self.issues.get(int(n))
+        if not issue:
+            return 404, {"message": "Not Found"}, {}
+        issue["assignees"] += [{"login": a} for a in body.get("assignees", [])]
+        return 201, self.issue_json(issue), {}
+
+    def list_events(self, query, body, repo, n):
+        return 200, [], {}
+
+    def list_members(self, query, body, org):
+        items = [{"login": self.users[m]["login"], "id": self.users[m]["id"]} for m in sorted(self.org_members)]
+        page, extra = self.page(items, query, f"/orgs/{org}/members")
+        return 200, page, extra
+
+    def check_member(self, query, body, org, login):
+        return (204 if login.lower() in self.org_members else 404), None, {}
+
+    def list_invitations(self, query, body, org):
+        page, extra = self.page(list(self.invitations.values()), query, f"/orgs/{org}/invitations")
+        return 200, page, extra
+
+    def list_failed_invitations(self, query, body, org):
+        page, extra = self.page(list(self.failed_invitations.values()), query, f"/orgs/{org}/failed_invitations")
+        return 200, page, extra
+
+    def create_invitation(self, query, body, org):
+        user = next((u for u in self.users.values() if u["id"] == body.get("invitee_id")), None)
+        if user is None:
+            return 422, {"message": "Validation Failed"}, {}
+        login = user["login"].lower()
+        if login in self.org_members or login in self.invitations:
+            return 422, {"message": "Validation Failed", "errors": [{"message": "Invitee is already a part of this organization"}]}, {}
+        self.failed_invitations.pop(login, None)
+        self.invitations[login] = self.invitation(user["login"])
+        return 201, self.invitations[login], {}
+
+    def list_team_members(self, query, body, org, slug):
+        if slug not in self.teams:
+            return 404, {"message": "Not Found"}, {}
+        items = [{"login": self.users[m]["login"] if m in self.users else m} for m in sorted(self.teams[slug]["members"])]
+        page, extra = self.page(items, query, f"/orgs/{org}/teams/{slug}/members")
+        return 200, page, extra
+
+    def list_team_invitations(self, query, body, org, slug):
+        if slug not in self.teams:
+            return 404, {"message": "Not Found"}, {}
+        items = [{"login": m} for m in sorted(self.teams[slug]["pending"])]
+        page, extra = self.page(items, query, f"/orgs/{org}/teams/{slug}/invitations")
+        return 200, page, extra
+
+    def get_team_membership(self, query, body, org, slug, login):
+        team = self.teams.get(slug)
+        if team and login.lower() in team["members"]:
+            return 200, {"state": "active", "role": "member"}, {}
+        if team and login.lower() in team["pending"]:
+            return 200, {"state": "pending", "role": "member"}, {}
+        return 404, {"message": "Not Found"}, {}
+
+    def put_team_membership(self, query, body, org, slug, login):
+        if slug not in self.teams:
+            return 404, {"message": "Not Found"}, {}
+        login = login.lower()
+        if login in self.org_members:
+            self.teams[slug]["members"].add(login)
+            return 200, {"state": "active", "role": "member"}, {}
+        if login in self.invitations:
+            self.teams[slug]["pending"].add(login)
+            return 200, {"state": "pending", "role": "member"}, {}
+        return 422, {"message": "User is not a member of the organization"}, {}
+
+    def get_user(self, query, body, login):
+        user = self.users.get(login.lower())
+        if not user:
+            return 404, {"message": "Not Found"}, {}
+        return 200, dict(user), {}
+
+    # --- GraphQL ------------------------------------------------------
+
+    TEAM_ALIAS_RE = re.compile(r'(\w+): organization\(login: \$org\) \{\s*team\(slug: "([^"]+)"\) \{\s*'
+                               r'members\(first: (\d+)(?:, after: "([^"]*)")?\)')
+    USER_ALIAS_RE = re.compile(r'(\w+): user\(login: "([^"]+)"\)')
+
+    def graphql(self, query, body):
+        """Answers the queries the join scripts send, recognised by shape"""
+        q = body.get("query", "")
+        v = body.get("variables") or {}
+        data = {}
+        if "repository(" in q:
+            issue = self.issues.get(int(v.get("number", 0)))
+            node = None
+            if issue:
+                offset = int(v.get("cursor") or 0)
+                ids = issue["comment_ids"]
+                nodes = [self.comment_node(self.comments[c]) for c in ids[offset:offset + 100]]
+                node = {"comments": {"pageInfo": {"hasNextPage": offset + 100 < len(ids),
+                                                  "endCursor": str(offset + 100)}, "nodes": nodes}}
+                if "labels(" in q:
+                    node.update(number=issue["number"], state=issue["state"].upper(),
+                                labels={"nodes": [{"name": l["name"]} for l in issue["labels"]]})
+            data["repository"] = {"issue": node}
+        if "user(login: $author)" in q:
+            user = self.users.get(str(v.get("author", "")).lower())
+            data["user"] = user and {
+                "databaseId": user["id"],
+                "organization": {"login": self.org} if user["login"].lower() in self.org_members else None,
+            }
+        for alias, login in self.USER_ALIAS_RE.findall(q):
+            user = self.users.get(login.lower())
+            data[alias] = user and {"login": user["login"], "databaseId": user["id"]}
+        for alias, slug, first, after in self.TEAM_ALIAS_RE.findall(q):
+            team = self.teams.get(slug)
+            if team is None:
+                data[alias] = {"team": None}
+                continue
+            logins = sorted(team["members"])
+            offset = int(after or 0)
+            end = offset + int(first)
+            data[alias] = {"team": {"members": {
+                "pageInfo": {"hasNextPage": end < len(logins), "endCursor": str(end)},
+                "nodes": [{"login": self.users[m]["login"] if m in self.users else m} for m in logins[offset:end]],
+            }}}
+        return 200, {"data": data}, {}
+
+    def comment_node(self, cmt):
+        return {
+            "databaseId": cmt["id"],
+            "body": cmt["body"],
+            "createdAt": cmt["created_at"],
+            "updatedAt": cmt["updated_at"],
+            "author": {"login": cmt["user"]["login"].replace("[bot]", ""), "__typename": cmt["user"]["type"]},
+        }
+
+    # --- server -------------------------------------------------------
+
+    def owns(self, path, body):
+        """Whether a request addresses this mock's org or repo"""
+        path = urllib.parse.unquote(path.split("?", 1)[0] + "/") + urllib.parse.unquote(path.partition("?")[2])
+        variables = (body.get("variables") or {}) if isinstance(body, dict) else {}
+        if path.startswith("/users/"):
+            return path.split("/")[2].lower() in self.users
+        return (f"/repos/{self.repo}/" in path or f"/orgs/{self.org}/" in path or f"repo:{self.repo} " in path
+                or variables.get("org") == self.org or
+                f"{variables.get('owner')}/{variables.get('name')}" == self.repo)
+
+    def serve(self, host="127.0.0.1", port=0, others=()):
+        """Start serving on a background thread; returns the server.
+
+        `others` are further mocks (other orgs/repos) served on the same
+        port; each request goes to the mock whose org or repo it names.
+        """
+        mocks = [self, *others]
+
+        def pick(path, body):
+            return next((m for m in mocks if m.owns(path, body)), self)
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                # Headers and body go out in separate writes; without this,
+                # Nagle + delayed ACK add ~40ms to every keep-alive response
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def dispatch(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                body = json.loads(raw) if raw else {}
+                mock = pick(self.path, body)
+                status, payload, extra = mock.handle(self.command, self.path, self.headers, body)
+                data = b"" if payload is None else json.dumps(payload).encode("utf-8")
+                if self.command == "GET" and status == 200:
+                    etag = '"' + hashlib.sha1(data).hexdigest() + '"'
+                    extra["ETag"] = etag
+                    if self.headers.get("If-None-Match") == etag:
+                        status, data = 304, b""
+                with mock.lock:
+                    mock.statuses[status] += 1
+                if data and "gzip" in (self.headers.get("Accept-Encoding") or ""):
+                    data = gzip.compress(data)
+                    extra["Content-Encoding"] = "gzip"
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, val in extra.items():
+                    self.send_header(k, val)
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = dispatch
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        for m in mocks:
+            m.base = f"http://{host}:{server.server_port}"
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the mock GitHub API in the foreground")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--issues", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+    mock = MockGitHub(latency=args.latency).seed(issues=args.issues)
+    mock.serve(port=args.port)
+    print(f"Mock GitHub API on {mock.base} (org {mock.org}, repo {mock.repo})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,136 @@
+"""Replay signed join webhooks against join_daemon.py backed by the mock API.
+
+Starts the mock, starts the daemon as a subprocess pointed at it, then sends
+an `issues.opened` and a `/approve` `issue_comment` webhook per issue (in
+bursts, so events for one issue queue up behind each other) and waits until
+the daemon has handled them all. Reports time to drain and API calls.
+
+    python .github/scripts/bench/replay_webhooks.py --issues 50 --latency 0.05
+"""
+import argparse
+import hashlib
+import hmac
+import http.client
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from mock_github import MockGitHub
+from run_bench import ROOT, SCRIPTS
+
+SECRET = "bench-secret"
+
+def issue_payload(mock, issue):
+    return {
+        "number": issue["number"],
+        "user": dict(issue["user"]),
+        "labels": [dict(l) for l in issue["labels"]],
+        "state": issue["state"],
+    }
+
+def opened_webhook(mock, issue):
+    return "issues", {
+        "action": "opened",
+        "issue": issue_payload(mock, issue),
+        "repository": {"full_name": mock.repo},
+        "sender": dict(issue["user"]),
+    }
+
+def approve_webhook(mock, issue, reviewer):
+    cmt = mock.add_comment(issue["number"], reviewer, "/approve")
+    return "issue_comment", {
+        "action": "created",
+        "issue": issue_payload(mock, issue),
+        "comment": {"id": cmt["id"], "body": cmt["body"], "user": {"login": reviewer, "type": "User"}},
+        "repository": {"full_name": mock.repo},
+        "sender": {"login": reviewer, "type": "User"},
+    }
+
+def post(port, name, payload, secret=SECRET):
+    body = json.dumps(payload).encode()
+    signature = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    conn.request("POST", "/", body, {"X-GitHub-Event": name, "X-Hub-Signature-256": signature,
+                                     "Content-Type": "application/json"})
+    status = conn.getresponse().status
+    conn.close()
+    return status
+
+def health(port):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    conn.request("GET", "/healthz")
+    stats = json.loads(conn.getresponse().read())
+    conn.close()
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--issues", type=int, default=30, help="synthetic join issues to seed")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every API call")
+    parser.add_argument("--workers", type=int, default=8, help="DAEMON_WORKERS")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds to wait for the queue to drain")
+    args = parser.parse_args()
+
+    mock = MockGitHub(latency=args.latency)
+    mock.seed(issues=args.issues)
+    server = mock.serve()
+
+    env = dict(os.environ, GITHUB_API_URL=mock.base, GITHUB_GRAPHQL_URL=f"{mock.base}/graphql",
+               GH_TOKEN="bench-token", ORG=mock.org, REPO=mock.repo, WEBHOOK_SECRET=SECRET,
+               GH_WRITE_RATE="50", GH_CONTENT_WRITES_PER_HOUR="1000000", DAEMON_PORT="0", DAEMON_WORKERS=str(args.workers))
+    daemon = subprocess.Popen([sys.executable, str(SCRIPTS / "join_daemon.py")], cwd=ROOT, env=env,
+                              stdout=subprocess.PIPE, text=True)
+    failed = False
+    try:
+        port = int(daemon.stdout.readline().rsplit(":", 1)[1])
+
+        # Forged and unrelated webhooks must not be queued
+        first = next(iter(mock.issues.values()))
+        if post(port, *opened_webhook(mock, first), secret="wrong") != 401:
+            print("FAIL: bad signature accepted", file=sys.stderr)
+            failed = True
+
+        webhooks = []
+        for issue in mock.issues.values():
+            if issue["state"] != "open":
+                continue
+            webhooks.append(opened_webhook(mock, issue))
+            if any(l["name"] == "target:vteam" for l in issue["labels"]):
+                webhooks.append(approve_webhook(mock, issue, "sunrisepeak"))
+
+        before = Counter(mock.calls)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(8) as pool:
+            statuses = Counter(pool.map(lambda w: post(port, *w), webhooks))
+        accepted = time.perf_counter() - start
+        while True:
+            stats = health(port)
+            if stats["done"] + stats["failed"] >= stats["queued"] and not stats["active"]:
+                break
+            if time.perf_counter() - start > args.timeout:
+                print("FAIL: queue did not drain", file=sys.stderr)
+                failed = True
+                break
+            time.sleep(0.05)
+        drained = time.perf_counter() - start
+        calls = mock.calls - before
+    finally:
+        daemon.terminate()
+        daemon.wait(timeout=30)
+        server.shutdown()
+
+    total = sum(calls.values())
+    print(f"{len(webhooks)} webhook(s): accepted in {accepted:.3f}s, drained in {drained:.3f}s, "
+          f"{total} API calls ({total / max(1, len(webhooks)):.2f}/event)")
+    print(f"   responses: {dict(statuses)}  daemon: {stats}")
+    for endpoint, n in sorted(calls.items(), key=lambda kv: -kv[1]):
+        print(f"   {n:6d}  {endpoint}")
+    if failed or stats["failed"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
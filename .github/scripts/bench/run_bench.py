@@ -0,0 +1,219 @@
+"""End-to-end benchmark of the join scripts against the local mock API.
+
+Seeds N synthetic join issues, runs the scanner and a sample of join_org.py
+events as the workflows would (fresh processes, same env variables), and
+reports wall time, API calls per issue and calls per endpoint.
+
+    python .github/scripts/bench/run_bench.py --issues 300 --latency 0.05
+    python .github/scripts/bench/run_bench.py --json bench.json --max-calls-per-issue scan=3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+from mock_github import MockGitHub
+
+ROOT = Path(__file__).resolve().parents[3]
+SCRIPTS = ROOT / ".github" / "scripts"
+
+def script_env(mock, args, workdir, extra=None):
+    env = dict(os.environ)
+    env.update({
+        "GITHUB_API_URL": mock.base,
+        "GITHUB_GRAPHQL_URL": f"{mock.base}/graphql",
+        "GH_TOKEN": "bench-token",
+        "ORG": mock.org,
+        "REPO": mock.repo,
+        "GH_WRITE_RATE": str(args.write_rate),
+        # The mock has no hourly limit; don't stretch large runs over hours
+        "GH_CONTENT_WRITES_PER_HOUR": "1000000",
+        "SCAN_WORKERS": str(args.workers),
+        "SCAN_STATE_FILE": str(Path(workdir) / "scan-state.jsonl"),
+        "JOIN_CONFIG_CACHE": str(Path(workdir) / "config-cache"),
+    })
+    if args.cache:
+        env["GH_CACHE_DIR"] = str(Path(workdir) / "gh-cache")
+    if args.graphql:
+        env["JOIN_USE_GRAPHQL"] = "1"
+    env.update(extra or {})
+    return env
+
+def run_script(name, env, *argv):
+    proc = subprocess.run([sys.executable, str(SCRIPTS / name), *argv], cwd=ROOT, env=env,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        print(f"{name} exited with {proc.returncode}:\n{proc.stderr.strip()}", file=sys.stderr)
+    return proc.returncode
+
+def measure(mocks, label, issues, fn):
+    mocks = mocks if isinstance(mocks, list) else [mocks]
+    total_calls = lambda: sum((m.calls for m in mocks), Counter())
+    total_statuses = lambda: sum((m.statuses for m in mocks), Counter())
+    before = total_calls()
+    statuses = total_statuses()
+    start = time.perf_counter()
+    failures = fn()
+    wall = time.perf_counter() - start
+    calls = total_calls() - before
+    total = sum(calls.values())
+    return {
+        "scenario": label,
+        "issues": issues,
+        "wall_seconds": round(wall, 3),
+        "api_calls": total,
+        "calls_per_issue": round(total / issues, 2) if issues else 0.0,
+        "by_endpoint": dict(sorted(calls.items(), key=lambda kv: -kv[1])),
+        "statuses": {str(k): v for k, v in sorted((total_statuses() - statuses).items())},
+        "failures": failures,
+    }
+
+def scan_scenario(mock, args, workdir, label, *argv):
+    open_issues = sum(1 for i in mock.issues.values() if i["state"] == "open")
+    env = script_env(mock, args, workdir)
+    return measure(mock, label, open_issues, lambda: int(run_script("scan_join_issues.py", env, *argv) != 0))
+
+def shard_scenario(mocks, args, workdir, label):
+    """One scanner run over several orgs/repos listed under `shards:`"""
+    config = (SCRIPTS.parent / "join-config.yml").read_text(encoding="utf-8").rstrip() + "\n\nshards:\n"
+    extra = {}
+    for i, m in enumerate(mocks):
+        config += f"  s{i}:\n    org: {m.org}\n    repo: {m.repo}\n    token_env: BENCH_TOKEN_{i}\n"
+        extra[f"BENCH_TOKEN_{i}"] = f"bench-token-{i}"
+    path = Path(workdir) / "shards-config.yml"
+    path.write_text(config, encoding="utf-8")
+    extra["JOIN_CONFIG"] = str(path)
+    env = script_env(mocks[0], args, workdir, extra)
+    open_issues = sum(1 for m in mocks for i in m.issues.values() if i["state"] == "open")
+    return measure(mocks, label, open_issues, lambda: int(run_script("scan_join_issues.py", env) != 0))
+
+def bulk_scenario(mock, args, workdir, label, resume=False):
+    """bulk_admit.py over a roster of newcomers, members, invitees and typos"""
+    roster = Path(workdir) / "roster.csv"
+    if not resume:
+        rows = ["username,target"]
+        for i in range(args.issues):
+            kind = i % 4
+            login = (mock.user(f"newcomer-{i}")["login"] if kind < 2 else
+                     f"member-{i % max(1, args.members)}" if kind == 2 else f"no-such-user-{i}")
+            rows.append(f"{login},{'vteam' if i % 3 == 0 else 'members'}")
+        roster.write_text("\n".join(rows) + "\n", encoding="utf-8")
+    env = script_env(mock, args, workdir)
+    argv = [str(roster), "--checkpoint", str(Path(workdir) / "bulk-checkpoint.jsonl")]
+    return measure(mock, label, args.issues, lambda: int(run_script("bulk_admit.py", env, *argv) != 0))
+
+def event_scenario(mock, args, workdir, label, events):
+    def run_all():
+        failures = 0
+        for extra in events:
+            failures += run_script("join_org.py", script_env(mock, args, workdir, extra)) != 0
+        return failures
+    return measure(mock, label, len(events), run_all)
+
+def opened_events(mock, count):
+    events = []
+    for issue in list(mock.issues.values())[:count]:
+        events.append({
+            "ISSUE_NUMBER": str(issue["number"]),
+            "ISSUE_AUTHOR": issue["user"]["login"],
+            "EVENT_NAME": "issues",
+            "EVENT_ACTION": "opened",
+            "ACTOR": issue["user"]["login"],
+        })
+    return events
+
+def approve_events(mock, count, reviewer):
+    events = []
+    for issue in mock.issues.values():
+        if len(events) >= count:
+            break
+        if issue["state"] != "open" or not any(l["name"] == "target:vteam" for l in issue["labels"]):
+            continue
+        mock.add_comment(issue["number"], reviewer, "/approve")
+        events.append({
+            "ISSUE_NUMBER": str(issue["number"]),
+            "ISSUE_AUTHOR": issue["user"]["login"],
+            "EVENT_NAME": "issue_comment",
+            "EVENT_ACTION": "created",
+            "COMMENT_BODY": "/approve",
+            "ACTOR": reviewer,
+        })
+    return events
+
+def print_report(results):
+    for r in results:
+        print(f"\n## {r['scenario']}: {r['issues']} issue(s), {r['wall_seconds']}s, "
+              f"{r['api_calls']} calls ({r['calls_per_issue']}/issue), failures: {r['failures']}")
+        print(f"   statuses: {r['statuses']}")
+        for endpoint, n in r["by_endpoint"].items():
+            print(f"   {n:6d}  {endpoint}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--issues", type=int, default=100, help="synthetic join issues to seed")
+    parser.add_argument("--members", type=int, default=200, help="existing org members")
+    parser.add_argument("--comments", type=int, default=3, help="filler comments per issue")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every API call")
+    parser.add_argument("--per-page-max", type=int, default=100, help="largest page the mock serves")
+    parser.add_argument("--rate-limit", type=int, default=0, help="primary limit per hour (0: unlimited)")
+    parser.add_argument("--secondary-every", type=int, default=0, help="answer every Nth write with 429")
+    parser.add_argument("--error-every", type=int, default=0, help="answer every Nth call with 502")
+    parser.add_argument("--workers", type=int, default=8, help="SCAN_WORKERS for the scanner")
+    parser.add_argument("--write-rate", type=float, default=50.0, help="GH_WRITE_RATE for the scripts")
+    parser.add_argument("--events", type=int, default=10, help="join_org.py events per scenario")
+    parser.add_argument("--expired-share", type=float, default=0.0,
+                        help="share of join issues whose invitation expired")
+    parser.add_argument("--shards", type=int, default=0, help="also scan this many extra orgs as shards")
+    parser.add_argument("--cache", action="store_true", help="enable the on-disk ETag cache")
+    parser.add_argument("--graphql", action="store_true", help="use the GraphQL path in join_org.py")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--max-calls-per-issue", action="append", default=[], metavar="SCENARIO=N",
+                        help="fail when a scenario makes more calls per issue (regression guard)")
+    args = parser.parse_args()
+
+    mock = MockGitHub(latency=args.latency, per_page_max=args.per_page_max,
+                      rate_limit=args.rate_limit, secondary_every=args.secondary_every,
+                      error_every=args.error_every)
+    mock.seed(issues=args.issues, members=args.members, comments=args.comments, expired_share=args.expired_share)
+    shard_mocks = []
+    for i in range(args.shards):
+        shard = MockGitHub(org=f"bench-org-{i}", repo=f"bench-org-{i}/members", latency=args.latency,
+                           per_page_max=args.per_page_max, error_every=args.error_every)
+        shard_mocks.append(shard.seed(issues=args.issues, members=args.members, comments=args.comments, seed=i + 2))
+    server = mock.serve(others=shard_mocks)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        results.append(event_scenario(mock, args, workdir, "join-opened", opened_events(mock, args.events)))
+        results.append(event_scenario(mock, args, workdir, "join-approve", approve_events(mock, args.events, "sunrisepeak")))
+        # Read-only: the plan must not write anything
+        results.append(scan_scenario(mock, args, workdir, "scan-plan", "--plan", str(Path(workdir) / "plan.json")))
+        results.append(scan_scenario(mock, args, workdir, "scan-cold"))
+        results.append(scan_scenario(mock, args, workdir, "scan-warm"))
+        results.append(bulk_scenario(mock, args, workdir, "bulk-admit"))
+        results.append(bulk_scenario(mock, args, workdir, "bulk-resume", resume=True))
+        if shard_mocks:
+            results.append(shard_scenario(shard_mocks, args, workdir, "scan-shards"))
+    server.shutdown()
+
+    print_report(results)
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    failed = False
+    for limit in args.max_calls_per_issue:
+        name, _, value = limit.partition("=")
+        for r in results:
+            if r["scenario"] == name and r["calls_per_issue"] > float(value):
+                print(f"REGRESSION: {name} made {r['calls_per_issue']} calls/issue (limit {value})", file=sys.stderr)
+                failed = True
+    if failed or any(r["failures"] for r in results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""Invite a whole roster at once instead of one join issue per person.
+
+    GH_TOKEN=... ORG=... python .github/scripts/bulk_admit.py cohort.csv --report result.csv
+
+The roster is a CSV (`username,target` columns, header optional) or JSONL
+(`{"username": ..., "target": ...}` per line); the target defaults to
+--target. Users who are already members or invited are skipped using one
+roster snapshot, ids are resolved in GraphQL batches, and invitations and
+team adds go out concurrently through the shared rate limiter.
+
+Every finished user is appended to the checkpoint file, so an interrupted
+run picks up where it stopped. Failed users are retried on the next run,
+and so are invited users whose team add could not be done yet (roster users
+have no join issue, so the scanner never completes it for them). Rows with
+an unknown target are not checkpointed, so they run once the config is
+fixed.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import issue_graphql
+import join_config
+import join_org
+from membership import MembershipSnapshot
+
+USER_AGENT = "join-org-bulk"
+# Statuses that are retried on the next run
+RETRY_STATUSES = ("failed", "invited-pending-team")
+# Config problems: reported, but not checkpointed
+CONFIG_ERRORS = ("unknown-target",)
+
+def read_roster(path, default_target):
+    """Yield (login, target) pairs from a CSV or JSONL roster"""
+    text = Path(path).read_text(encoding="utf-8-sig")
+    if path.endswith((".jsonl", ".json")):
+        for n, line in enumerate(text.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                print(f"{path}:{n}: not JSON, skipped", file=sys.stderr)
+                continue
+            login = rec.get("username") or rec.get("login") or rec.get("user") or ""
+            yield login.strip().lstrip("@"), (rec.get("target") or default_target).strip()
+        return
+    rows = list(csv.reader(text.splitlines()))
+    if rows and rows[0] and rows[0][0].strip().lower() in ("username", "login", "user"):
+        rows = rows[1:]
+    for row in rows:
+        if not row or not row[0].strip() or row[0].lstrip().startswith("#"):
+            continue
+        target = row[1].strip() if len(row) > 1 and row[1].strip() else default_target
+        yield row[0].strip().lstrip("@"), target
+
+class Checkpoint:
+    """Per-user results as JSONL, appended as users finish"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.results = {}
+        if self.path.exists():
+            for line in self.path.read_text(encoding="utf-8").splitlines():
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                self.results[rec["login"].lower()] = rec
+
+    def done(self, login):
+        rec = self.results.get(login.lower())
+        return rec is not None and rec["status"] not in RETRY_STATUSES
+
+    def record(self, login, target, status, detail=""):
+        rec = {"login": login, "target": target, "status": status, "detail": detail}
+        with self._lock:
+            self.results[login.lower()] = rec
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        return rec
+
+def plan_user(members, config, login, target):
+    """(status, in_org, needs_invite, team_slug) from the snapshot alone"""
+    if target not in config.targets:
+        return "unknown-target", False, False, ""
+    team_slug = config.targets[target].team_slug
+    in_org = members.is_org_member(login)
+    # An expired invitation can no longer be accepted: invite again
+    invited = not in_org and members.invite_state(login) == "live"
+    in_team = not team_slug or members.is_in_team(team_slug, login)
+    if in_team and in_org:
+        return "already-member", in_org, False, ""
+    if in_team and invited:
+        return "already-invited", in_org, False, ""
+    return "pending", in_org, not in_org and not invited, "" if in_team else team_slug
+
+def admit(token, org, members, login, target, user_id, in_org, needs_invite, team_slug):
+    """Invite and/or add to the team; returns (status, detail)"""
+    status = "team-added"
+    if needs_invite:
+        if user_id is None:
+            return "not-found", "no such GitHub user"
+        code, payload = join_org.invite_to_org(token, org, user_id, login)
+        if code not in (201, 202):
+            return "failed", f"invite: HTTP {code} {json.dumps(payload, ensure_ascii=False)}"
+        status = "invited"
+    if team_slug:
+        code, payload = join_org.add_user_to_team(token, org, team_slug, login)
+        if code not in (200, 201):
+            # Invited but not yet in the org: the next run retries the team add
+            if not in_org:
+                return "invited-pending-team", f"team {team_slug}: HTTP {code}"
+            return "failed", f"team {team_slug}: HTTP {code} {json.dumps(payload, ensure_ascii=False)}"
+        members.mark_team_member(team_slug, login)
+        detail = f"team {team_slug}: {(payload or {}).get('state', 'active')}"
+        return status, detail
+    return status, ""
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("roster", help="CSV or JSONL file of usernames and targets")
+    parser.add_argument("--target", default="members", help="target for rows without one")
+    parser.add_argument("--checkpoint", default=".cache/bulk-admit-checkpoint.jsonl",
+                        help="results of earlier runs; finished users are skipped")
+    parser.add_argument("--report", help="write the per-user results of this run as CSV")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent invitations")
+    parser.add_argument("--batch", type=int, default=50, help="users per GraphQL id lookup")
+    parser.add_argument("--dry-run", action="store_true", help="only show what would be done")
+    args = parser.parse_args()
+
+    token = os.environ["GH_TOKEN"]
+    config = join_config.load_config()
+    org = os.environ.get("ORG", "").strip() or config.org
+
+    roster = {}
+    for login, target in read_roster(args.roster, args.target):
+        if login:
+            roster.setdefault(login.lower(), (login, target))
+    checkpoint = Checkpoint(args.checkpoint)
+    todo = [(login, target) for key, (login, target) in roster.items() if not checkpoint.done(key)]
+    print(f"{len(roster)} user(s) in roster, {len(roster) - len(todo)} already done")
+    if not todo:
+        return
+
+    members = MembershipSnapshot(token, org, user_agent=USER_AGENT).load(config.team_slugs)
+
+    results = []
+    work = []
+    for login, target in todo:
+        status, in_org, needs_invite, team_slug = plan_user(members, config, login, target)
+        if status != "pending":
+            results.append({"login": login, "target": target, "status": status, "detail": ""})
+        else:
+            work.append((login, target, in_org, needs_invite, team_slug))
+
+    if args.dry_run:
+        for login, target, in_org, needs_invite, team_slug in work:
+            steps = (["invite"] if needs_invite else []) + ([f"team {team_slug}"] if team_slug else [])
+            results.append({"login": login, "target": target, "status": "would-" + "+".join(steps), "detail": ""})
+    else:
+        for rec in results:
+            if rec["status"] not in CONFIG_ERRORS:
+                checkpoint.record(**rec)
+        ids = issue_graphql.resolve_user_ids(token, [w[0] for w in work if w[3]], batch=args.batch,
+                                             user_agent=USER_AGENT)
+
+        def run(item):
+            login, target, in_org, needs_invite, team_slug = item
+            try:
+                status, detail = admit(token, org, members, login, target, ids.get(login.lower()),
+                                       in_org, needs_invite, team_slug)
+            except Exception as e:
+                status, detail = "failed", repr(e)
+            return checkpoint.record(login, target, status, detail)
+
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            results.extend(pool.map(run, work))
+
+    counts = Counter(r["status"] for r in results)
+    for status, n in sorted(counts.items()):
+        print(f"{n:6d}  {status}")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["login", "target", "status", "detail"])
+            writer.writeheader()
+            writer.writerows(results)
+    if counts.get("invited-pending-team"):
+        print(f"{counts['invited-pending-team']} invited user(s) still need their team; "
+              "run again once they have accepted")
+    errors = []
+    if counts.get("unknown-target"):
+        errors.append(f"{counts['unknown-target']} user(s) name a target missing from join-config.yml")
+    if counts.get("failed"):
+        errors.append(f"{counts['failed']} user(s) failed; run again to retry them")
+    if errors:
+        raise SystemExit("; ".join(errors))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+MAX_BYTES = int(os.environ.get("GH_CACHE_MAX_BYTES", str(50 * 1024 * 1024)) or 0)
+
+# How long (seconds) a cached GET may be served without asking GitHub at all.
+# Everything else is revalidated with If-None-Match/If-Modified-Since, which
+# costs a round trip but no primary rate limit when the answer is 304.
+TTLS = [
+    # login -> id: logins can be renamed and released logins re-claimed by
+    # another account, so only long enough to cover a single run
+    (re.compile(r"^users/[^/?]+$"), 5 * 60),
+]
+
+# Never written to disk: invitation payloads carry invitee emails, and CI
+# persists the cache directory between runs
+NO_STORE = [
+    re.compile(r"^orgs/[^/]+/(teams/[^/]+/)?(failed_)?invitations(\?|$)"),
+]
+
+# Response headers worth replaying with a cached body
+KEPT_HEADERS = ("Content-Type", "Link", "ETag", "Last-Modified")
+
+def ttl_for(path):
+    for pattern, ttl in TTLS:
+        if pattern.match(path):
+            return ttl
+    return 0
+
+def is_cacheable(path):
+    return not any(pattern.match(path) for pattern in NO_STORE)
+
+class ResponseCache:
+    """On-disk cache of GET responses keyed by URL, with LRU eviction.
+
+    One JSON file per entry; file mtime doubles as the LRU clock, so a cache
+    directory restored by CI keeps its eviction order.
+    """
+
+    def __init__(self, root, max_bytes=MAX_BYTES):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._sizes = {p.name: p.stat().st_size for p in self.root.glob("*.json")}
+
+    def _file(self, url):
+        return self.root / (hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, url):
+        f = self._file(url)
+        try:
+            entry = json.loads(f.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if entry.get("url") != url:
+            return None
+        try:
+            os.utime(f)
+        except OSError:
+            pass
+        return entry
+
+    def is_fresh(self, entry):
+        return time.time() - entry.get("stored_at", 0) < entry.get("ttl", 0)
+
+    def put(self, url, status, text, headers, ttl=0):
+        if not (headers.get("ETag") or headers.get("Last-Modified")) and not ttl:
+            return
+        entry = {
+            "url": url,
+            "status": status,
+            "stored_at": time.time(),
+            "ttl": ttl,
+            "headers": {k: headers[k] for k in KEPT_HEADERS if headers.get(k)},
+            "body": text,
+        }
+        data = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+        if self.max_bytes and len(data) > self.max_bytes:
+            return
+        f = self._file(url)
+        tmp = f.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, f)
+        with self._lock:
+            self._sizes[f.name] = len(data)
+            self._evict()
+
+    def touch(self, url, headers):
+        """Refresh an entry after a 304 so it counts as recently validated"""
+        entry = self.get(url)
+        if entry:
+            fresh = {k: headers[k] for k in KEPT_HEADERS if headers.get(k)}
+            self.put(url, entry["status"], entry["body"], {**entry["headers"], **fresh}, entry.get("ttl", 0))
+
+    def _evict(self):
+        total = sum(self._sizes.values())
+        if not self.max_bytes or total <= self.max_bytes:
+            return
+        files = []
+        for name in self._sizes:
+            try:
+                files.append(((self.root / name).stat().st_mtime, name))
+            except OSError:
+                files.append((0, name))
+        for _, name in sorted(files):
+            if total <= self.max_bytes:
+                break
+            total -= self._sizes.pop(name)
+            try:
+                (self.root / name).unlink()
+            except OSError:
+                pass
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """The cache under $GH_CACHE_DIR, or None when caching is disabled"""
+    global _cache
+    root = os.environ.get("GH_CACHE_DIR", "").strip()
+    if not root:
+        return None
+    with _cache_lock:
+        if _cache is None or _cache.root != Path(root):
+            _cache = ResponseCache(root)
+        return _cache
@@ -0,0 +1,293 @@
+import gzip
+import http.client
+import email.message
+import json
+import os
+import queue
+import re
+import threading
+import time
+import urllib.parse
+
+import gh_cache
+import gh_metrics
+import gh_ratelimit
+import gh_retry
+
+# Actions sets both; overriding them points the scripts at another server
+API = os.environ.get("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+GRAPHQL_URL = os.environ.get("GITHUB_GRAPHQL_URL", "") or f"{API}/graphql"
+TIMEOUT = float(os.environ.get("GH_TIMEOUT", "30") or 30)
+POOL_SIZE = int(os.environ.get("GH_POOL_SIZE", "8") or 8)
+
+class ConnectionPool:
+    """Keep-alive HTTP/1.1 connections to a single host, reused across calls"""
+
+    def __init__(self, scheme, host, size=POOL_SIZE):
+        self.scheme = scheme
+        self.host = host
+        self.size = size
+        self.idle = queue.LifoQueue()
+
+    def get(self, timeout):
+        try:
+            conn = self.idle.get_nowait()
+            reused = True
+        except queue.Empty:
+            cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            conn = cls(self.host, timeout=gh_retry.CONNECT_TIMEOUT)
+            conn.connect()
+            reused = False
+        # Connect with the short timeout, then allow `timeout` per read
+        conn.timeout = timeout
+        conn.sock.settimeout(timeout)
+        return conn, reused
+
+    def put(self, conn):
+        if self.idle.qsize() < self.size:
+            self.idle.put(conn)
+        else:
+            conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(scheme, host):
+    with _pools_lock:
+        pool = _pools.get((scheme, host))
+        if pool is None:
+            pool = _pools[(scheme, host)] = ConnectionPool(scheme, host)
+        return pool
+
+def close_all():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+def build_url(path):
+    if path.startswith(("http://", "https://")):
+        return path
+    return f"{API}/{path.lstrip('/')}"
+
+def decode_text(raw, headers):
+    encoding = (headers.get("Content-Encoding") or "").lower()
+    if encoding == "gzip":
+        raw = gzip.decompress(raw)
+    return raw.decode("utf-8")
+
+def parse_json(text):
+    if not text:
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+_decoder = json.JSONDecoder()
+_space = re.compile(r"[\s,]*")
+
+def iter_json_array(text):
+    """Yield the items of a JSON array one at a time.
+
+    Only one decoded item is alive at a time, instead of the whole page as
+    a list of dicts. Anything but an array is decoded whole: a list of its
+    `items` (search results) or nothing.
+    """
+    pos = _space.match(text, 0).end()
+    if not text.startswith("[", pos):
+        payload = parse_json(text)
+        yield from payload.get("items", []) if isinstance(payload, dict) else []
+        return
+    pos += 1
+    while True:
+        pos = _space.match(text, pos).end()
+        if pos >= len(text) or text[pos] == "]":
+            return
+        item, pos = _decoder.raw_decode(text, pos)
+        yield item
+
+def cached_headers(entry, live=None):
+    msg = email.message.Message()
+    for k, v in entry["headers"].items():
+        msg[k] = v
+    for k, v in (live.items() if live is not None else ()):
+        if k not in msg:
+            msg[k] = v
+    return msg
+
+def request(method: str, path: str, token: str, body=None, user_agent="join-org-action", timeout=None,
+            verify=None, decode=True):
+    """Send one API call; returns (status, payload, headers).
+
+    GETs go through the on-disk ETag cache when GH_CACHE_DIR is set: fresh
+    entries are served locally, others are revalidated and a 304 answers
+    with the cached body.
+
+    Timeouts, dropped connections and 5xx responses are retried with jittered
+    backoff when repeating the call is safe. For other writes, `verify()` is
+    asked first whether the failed attempt took effect anyway; it returns
+    (status, payload) if so, None to retry. Without it they are not retried.
+
+    With decode=False the payload is the undecoded response text.
+    """
+    parse = parse_json if decode else (lambda text: text or "")
+    started = time.perf_counter()
+    full_url = build_url(path)
+    rel_path = full_url[len(API):] if full_url.startswith(API) else urllib.parse.urlsplit(full_url).path
+    cacheable = method == "GET" and gh_cache.is_cacheable(rel_path.lstrip("/"))
+    cache = gh_cache.get_cache() if cacheable else None
+    entry = cache.get(full_url) if cache else None
+    if entry and cache.is_fresh(entry):
+        gh_metrics.metrics.record(method, rel_path, entry["status"], time.perf_counter() - started, cache="hit")
+        return entry["status"], parse(entry["body"]), cached_headers(entry)
+
+    extra = {}
+    if entry:
+        if entry["headers"].get("ETag"):
+            extra["If-None-Match"] = entry["headers"]["ETag"]
+        if entry["headers"].get("Last-Modified"):
+            extra["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+
+    # Every call goes through the token's rate limiter; rate-limited
+    # responses are retried after the wait GitHub asks for.
+    limiter = gh_ratelimit.get_limiter(token)
+    retryable = gh_retry.is_idempotent(method, rel_path) or verify is not None
+    attempt = failures = 0
+    while True:
+        try:
+            gh_retry.breaker.before()
+            limiter.before(method, rel_path)
+            status, text, headers = send(method, full_url, token, body, user_agent, timeout, extra)
+        except Exception as e:
+            transient = isinstance(e, gh_retry.TRANSIENT_ERRORS)
+            if transient:
+                gh_retry.breaker.failure()
+            if not transient or not retryable or failures >= gh_retry.MAX_RETRIES:
+                # Failed calls show up in the metrics under the exception name
+                gh_metrics.metrics.record(method, rel_path, type(e).__name__, time.perf_counter() - started,
+                                          retries=attempt + failures, cache="miss" if cache else "off")
+                raise
+        else:
+            limiter.after(rel_path, headers)
+            if status >= 500:
+                gh_retry.breaker.failure()
+            else:
+                gh_retry.breaker.success()
+            delay = limiter.retry_delay(status, headers, text, attempt)
+            if delay is not None and delay <= gh_ratelimit.MAX_WAIT:
+                time.sleep(delay)
+                attempt += 1
+                continue
+            if status < 500 or not retryable or failures >= gh_retry.MAX_RETRIES:
+                break
+        # A write may have landed even though we saw no answer; check
+        # before sending it again
+        if verify is not None and not gh_retry.is_idempotent(method, rel_path):
+            found = verify()
+            if found is not None:
+                gh_metrics.metrics.record(method, rel_path, found[0], time.perf_counter() - started,
+                                          retries=attempt + failures, cache="off")
+                return found[0], found[1], email.message.Message()
+        time.sleep(gh_retry.backoff(failures))
+        failures += 1
+    cache_state = "miss" if cache else "off"
+    if cache:
+        if status == 304 and entry:
+            cache.touch(full_url, headers)
+            gh_metrics.metrics.record(method, rel_path, status, time.perf_counter() - started,
+                                      retries=attempt + failures, cache="revalidated", headers=headers)
+            return entry["status"], parse(entry["body"]), cached_headers(entry, headers)
+        if status == 200:
+            cache.put(full_url, status, text, headers, gh_cache.ttl_for(rel_path.lstrip("/")))
+    gh_metrics.metrics.record(method, rel_path, status, time.perf_counter() - started,
+                              retries=attempt + failures, cache=cache_state, headers=headers)
+    return status, parse(text), headers
+
+def send(method, full_url, token, body=None, user_agent="join-org-action", timeout=None, extra_headers=None):
+    """One HTTP exchange over a pooled connection; returns (status, text, headers)"""
+    url = urllib.parse.urlsplit(full_url)
+    target = url.path + (f"?{url.query}" if url.query else "")
+    headers = {
+        "Accept": "application/vnd.github+json",
+        "Accept-Encoding": "gzip",
+        "Authorization": f"Bearer {token}",
+        "User-Agent": user_agent,
+        "Connection": "keep-alive",
+        **(extra_headers or {}),
+    }
+    data = None
+    if body is not None:
+        data = json.dumps(body).encode("utf-8")
+        headers["Content-Type"] = "application/json"
+
+    pool = get_pool(url.scheme, url.netloc)
+    while True:
+        conn, reused = pool.get(timeout or TIMEOUT)
+        try:
+            conn.request(method, target, body=data, headers=headers)
+            resp = conn.getresponse()
+            raw = resp.read()
+        except (http.client.RemoteDisconnected, http.client.CannotSendRequest,
+                ConnectionResetError, BrokenPipeError):
+            conn.close()
+            # The server may drop an idle keep-alive connection at any time;
+            # only a fresh connection failing is a real error.
+            if reused:
+                continue
+            raise
+        except Exception:
+            conn.close()
+            raise
+        if resp.will_close:
+            conn.close()
+        else:
+            pool.put(conn)
+        return resp.status, decode_text(raw, resp.headers), resp.headers
+
+def gh(method: str, path: str, token: str, body=None, user_agent="join-org-action", verify=None):
+    code, payload, _ = request(method, path, token, body, user_agent=user_agent, verify=verify)
+    return code, payload
+
+def graphql(query: str, variables: dict, token: str, user_agent="join-org-action"):
+    """Run one GraphQL query and return its `data`; raises on HTTP or GraphQL errors"""
+    code, payload = gh("POST", GRAPHQL_URL, token, {"query": query, "variables": variables}, user_agent=user_agent)
+    if code != 200 or not isinstance(payload, dict):
+        raise RuntimeError(f"GraphQL failed: {code} {payload}")
+    # NOT_FOUND only nulls out that field (e.g. an unknown team), keep the rest
+    errors = [e for e in payload.get("errors") or [] if e.get("type") != "NOT_FOUND"]
+    if errors or payload.get("data") is None:
+        raise RuntimeError(f"GraphQL errors: {payload.get('errors')}")
+    return payload["data"]
+
+def next_page_url(headers):
+    # Link: <https://api.github.com/...&page=2>; rel="next", <...>; rel="last"
+    link = headers.get("Link", "") if headers else ""
+    for part in link.split(","):
+        m = re.match(r'\s*<([^>]+)>\s*;\s*rel="next"', part)
+        if m:
+            return m.group(1)
+    return None
+
+def paginate(path: str, token: str, user_agent="join-org-action", project=None):
+    """Yield every item of a list endpoint (or a search result), page by page.
+
+    Items are decoded one at a time; `project` turns each into the compact
+    record the caller keeps (see records.py), so the raw dicts are dropped
+    right away.
+    """
+    url = path
+    while url:
+        code, text, headers = request("GET", url, token, user_agent=user_agent, decode=False)
+        if code != 200:
+            raise RuntimeError(f"GET {path} failed: {code} {text}")
+        for item in iter_json_array(text):
+            yield project(item) if project else item
+        url = next_page_url(headers)
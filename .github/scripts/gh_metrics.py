@@ -0,0 +1,148 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+# Latest durations kept per endpoint for p50/p95; bounded so the daemon's
+# metrics do not grow with every call
+SAMPLES = 1024
+
+def endpoint_template(path):
+    """repos/o/r/issues/12/comments -> repos/{owner}/{repo}/issues/{n}/comments"""
+    parts = path.split("?", 1)[0].strip("/").split("/")
+    out = []
+    for i, part in enumerate(parts):
+        prev = parts[i - 1] if i else ""
+        if prev == "repos":
+            out.append("{owner}")
+        elif i >= 2 and parts[i - 2] == "repos":
+            out.append("{repo}")
+        elif prev == "orgs":
+            out.append("{org}")
+        elif prev == "teams":
+            out.append("{team}")
+        elif prev in ("users", "members", "memberships"):
+            out.append("{user}")
+        elif prev == "labels":
+            out.append("{name}")
+        elif part.isdigit():
+            out.append("{n}")
+        else:
+            out.append(part)
+    return "/".join(out)
+
+class Metrics:
+    """Per-endpoint call statistics for one process.
+
+    Hooks registered with add_hook() receive every call as a dict, for
+    external profilers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.endpoints = {}
+        self.rate = {}
+        self.hooks = []
+
+    def add_hook(self, fn):
+        self.hooks.append(fn)
+
+    def record(self, method, path, status, seconds, retries=0, cache="miss", headers=None):
+        key = f"{method} {endpoint_template(path)}"
+        with self._lock:
+            ep = self.endpoints.setdefault(key, {
+                "calls": 0, "seconds": 0.0, "max_seconds": 0.0, "retries": 0,
+                "statuses": {}, "cache": {}, "histogram": [0] * len(BUCKETS),
+                "durations": deque(maxlen=SAMPLES),
+            })
+            ep["calls"] += 1
+            ep["seconds"] += seconds
+            ep["max_seconds"] = max(ep["max_seconds"], seconds)
+            ep["retries"] += retries
+            ep["statuses"][str(status)] = ep["statuses"].get(str(status), 0) + 1
+            ep["cache"][cache] = ep["cache"].get(cache, 0) + 1
+            ep["histogram"][next(i for i, b in enumerate(BUCKETS) if seconds <= b)] += 1
+            ep["durations"].append(seconds)
+            if headers is not None and headers.get("X-RateLimit-Remaining") is not None:
+                res = headers.get("X-RateLimit-Resource") or "core"
+                remaining = int(headers["X-RateLimit-Remaining"])
+                state = self.rate.setdefault(res, {"limit": int(headers.get("X-RateLimit-Limit") or 0),
+                                                   "min_remaining": remaining, "used": 0})
+                state["min_remaining"] = min(state["min_remaining"], remaining)
+                state["used"] += 1
+        event = {"method": method, "endpoint": key.split(" ", 1)[1], "status": status,
+                 "seconds": seconds, "retries": retries, "cache": cache}
+        for hook in self.hooks:
+            try:
+                hook(event)
+            except Exception:
+                pass
+
+    def report(self):
+        with self._lock:
+            endpoints = {}
+            for key, ep in sorted(self.endpoints.items(), key=lambda kv: -kv[1]["calls"]):
+                durations = sorted(ep["durations"])
+                endpoints[key] = {
+                    "calls": ep["calls"],
+                    "total_seconds": round(ep["seconds"], 4),
+                    "p50_seconds": round(durations[len(durations) // 2], 4),
+                    "p95_seconds": round(durations[min(len(durations) - 1, int(len(durations) * 0.95))], 4),
+                    "max_seconds": round(ep["max_seconds"], 4),
+                    "retries": ep["retries"],
+                    "statuses": dict(ep["statuses"]),
+                    "cache": dict(ep["cache"]),
+                    "histogram": {("inf" if b == float("inf") else str(b)): n
+                                  for b, n in zip(BUCKETS, ep["histogram"])},
+                }
+            return {
+                "wall_seconds": round(time.time() - self.started, 3),
+                "calls": sum(ep["calls"] for ep in self.endpoints.values()),
+                "retries": sum(ep["retries"] for ep in self.endpoints.values()),
+                "endpoints": endpoints,
+                "rate_limit": {res: dict(state) for res, state in self.rate.items()},
+            }
+
+    def markdown(self, title="GitHub API usage"):
+        rep = self.report()
+        lines = [f"### {title}", "",
+                 f"{rep['calls']} calls, {rep['retries']} retries, {rep['wall_seconds']}s wall time", "",
+                 "| Endpoint | Calls | p50 (s) | p95 (s) | Max (s) | Retries | Statuses | Cache |",
+                 "| --- | ---: | ---: | ---: | ---: | ---: | --- | --- |"]
+        for key, ep in rep["endpoints"].items():
+            statuses = ", ".join(f"{k}×{v}" for k, v in sorted(ep["statuses"].items()))
+            cache = ", ".join(f"{k}×{v}" for k, v in sorted(ep["cache"].items()))
+            lines.append(f"| `{key}` | {ep['calls']} | {ep['p50_seconds']} | {ep['p95_seconds']} | "
+                         f"{ep['max_seconds']} | {ep['retries']} | {statuses} | {cache} |")
+        if rep["rate_limit"]:
+            lines += ["", "| Rate limit | Limit | Lowest remaining | Calls seen |", "| --- | ---: | ---: | ---: |"]
+            for res, state in sorted(rep["rate_limit"].items()):
+                lines.append(f"| {res} | {state['limit']} | {state['min_remaining']} | {state['used']} |")
+        return "\n".join(lines) + "\n"
+
+    def write(self, title=None):
+        """Write the JSON report to $GH_METRICS_FILE and the table to $GITHUB_STEP_SUMMARY"""
+        if not self.endpoints:
+            return
+        title = title or f"GitHub API usage: {os.path.basename(sys.argv[0])}"
+        json_path = os.environ.get("GH_METRICS_FILE", "").strip()
+        if json_path:
+            Path(json_path).parent.mkdir(parents=True, exist_ok=True)
+            Path(json_path).write_text(json.dumps(self.report(), indent=2), encoding="utf-8")
+        summary = os.environ.get("GITHUB_STEP_SUMMARY", "").strip()
+        if summary:
+            with open(summary, "a", encoding="utf-8") as f:
+                f.write(self.markdown(title))
+
+metrics = Metrics()
+atexit.register(metrics.write)
+
+def add_hook(fn):
+    metrics.add_hook(fn)
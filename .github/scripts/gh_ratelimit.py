@@ -0,0 +1,149 @@
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+
+# Keep this many calls of every resource in hand; below it we wait for the reset.
+RESERVE = int(os.environ.get("GH_RATE_RESERVE", "10") or 0)
+# Start spreading the remaining calls evenly over the window below this share.
+PACE_BELOW = 0.2
+# Writes: GitHub's secondary limits allow about 80 content-creating
+# requests a minute; one write per second leaves headroom.
+WRITE_RATE = float(os.environ.get("GH_WRITE_RATE", "1.0") or 1.0)
+WRITE_BURST = int(os.environ.get("GH_WRITE_BURST", "5") or 1)
+# ...and at most 500 content-creating requests an hour
+CONTENT_PER_HOUR = float(os.environ.get("GH_CONTENT_WRITES_PER_HOUR", "450") or 450)
+MAX_RETRIES = int(os.environ.get("GH_RATE_RETRIES", "3") or 0)
+# Never sleep longer than this for one call; fail it instead.
+MAX_WAIT = float(os.environ.get("GH_RATE_MAX_WAIT", "900") or 900)
+
+WRITE_METHODS = ("POST", "PATCH", "PUT", "DELETE")
+# POSTs that create content: comments, label adds and invitations
+CONTENT_RE = re.compile(r"^(repos/[^/]+/[^/]+/issues/\d+/(comments|labels)|orgs/[^/]+/invitations)$")
+
+def is_content_write(method, path):
+    return method == "POST" and bool(CONTENT_RE.match(path.split("?", 1)[0].strip("/")))
+
+def resource_for(path):
+    path = path.lstrip("/")
+    if path.startswith("search/"):
+        return "search"
+    if path.startswith("graphql") or path.endswith("/graphql"):
+        return "graphql"
+    return "core"
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+                self.stamp = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class RateLimiter:
+    """Paces calls for one token from the rate-limit headers GitHub returns.
+
+    Tracks limit/remaining/reset per resource (core, search, graphql), waits
+    for the reset when a resource is nearly spent, spreads the last part of
+    the budget over the window, and meters writes through a per-second token
+    bucket and content-creating writes through an hourly one.
+    """
+
+    def __init__(self, write_rate=WRITE_RATE, write_burst=WRITE_BURST, reserve=RESERVE):
+        self.reserve = reserve
+        self.writes = TokenBucket(write_rate, write_burst)
+        self.content = TokenBucket(CONTENT_PER_HOUR / 3600, CONTENT_PER_HOUR)
+        self.resources = {}
+        self._lock = threading.Lock()
+
+    def before(self, method, path):
+        res = resource_for(path)
+        with self._lock:
+            state = self.resources.get(res)
+            wait = 0.0
+            if state:
+                left = state["reset"] - time.time()
+                if left > 0:
+                    if state["remaining"] <= self.reserve:
+                        wait = left + 1
+                    elif state["limit"] and state["remaining"] < state["limit"] * PACE_BELOW:
+                        # Hand out evenly spaced slots, shared by all workers
+                        now = time.monotonic()
+                        slot = max(now, state.get("next_slot", now))
+                        state["next_slot"] = slot + left / (state["remaining"] - self.reserve)
+                        wait = slot - now
+                    # Count the call now so concurrent workers see it too
+                    state["remaining"] -= 1
+        if wait > MAX_WAIT:
+            raise RuntimeError(f"GitHub {res} rate limit exhausted; resets in {int(wait)}s")
+        if wait > 0:
+            time.sleep(wait)
+        if method in WRITE_METHODS and res != "graphql":
+            self.writes.acquire()
+        if is_content_write(method, path):
+            self.content.acquire()
+
+    def after(self, path, headers):
+        if headers is None or headers.get("X-RateLimit-Remaining") is None:
+            return
+        res = headers.get("X-RateLimit-Resource") or resource_for(path)
+        try:
+            state = {
+                "limit": int(headers.get("X-RateLimit-Limit") or 0),
+                "remaining": int(headers["X-RateLimit-Remaining"]),
+                "reset": float(headers.get("X-RateLimit-Reset") or 0),
+            }
+        except ValueError:
+            return
+        with self._lock:
+            # Merge, so the slot schedule (next_slot) survives each response
+            current = self.resources.setdefault(res, {})
+            if current.get("reset") == state["reset"]:
+                # Same window: keep calls counted by before() but not yet answered
+                state["remaining"] = min(state["remaining"], current["remaining"])
+            current.update(state)
+
+    def retry_delay(self, status, headers, text, attempt):
+        """Seconds to wait before retrying a rate-limited response, or None"""
+        if status not in (403, 429) or attempt >= MAX_RETRIES:
+            return None
+        headers = headers or {}
+        retry_after = headers.get("Retry-After")
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        if headers.get("X-RateLimit-Remaining") == "0" and headers.get("X-RateLimit-Reset"):
+            return max(1.0, float(headers["X-RateLimit-Reset"]) - time.time() + 1)
+        if status == 429 or "rate limit" in (text or "").lower():
+            # Secondary limit without a hint: back off at least a minute
+            return 60 * (2 ** attempt) + random.uniform(0, 5)
+        # A plain 403 (missing permission) is not retried
+        return None
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(token):
+    """One limiter per token, i.e. per rate-limit budget"""
+    key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = RateLimiter()
+        return limiter
@@ -0,0 +1,73 @@
+import http.client
+import os
+import random
+import threading
+import time
+
+# A connection that cannot be opened in this time is not going to work;
+# GH_TIMEOUT (gh_client) bounds each read on an open connection.
+CONNECT_TIMEOUT = float(os.environ.get("GH_CONNECT_TIMEOUT", "5") or 5)
+# Retries for timeouts, dropped connections and 5xx responses
+MAX_RETRIES = int(os.environ.get("GH_RETRIES", "3") or 0)
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+# Consecutive failures that open the circuit, and how long it stays open
+BREAKER_FAILURES = int(os.environ.get("GH_BREAKER_FAILURES", "5") or 5)
+BREAKER_COOLDOWN = float(os.environ.get("GH_BREAKER_COOLDOWN", "30") or 30)
+
+TRANSIENT_ERRORS = (OSError, http.client.HTTPException)
+
+# POSTs that are safe to repeat: adding labels or assignees twice is a no-op,
+# and the GraphQL queries we send are read-only.
+IDEMPOTENT_POST_SUFFIXES = ("/labels", "/assignees", "/graphql")
+
+def is_idempotent(method, path):
+    if method in ("GET", "HEAD", "PUT", "DELETE", "PATCH"):
+        return True
+    return method == "POST" and path.split("?", 1)[0].rstrip("/").endswith(IDEMPOTENT_POST_SUFFIXES)
+
+def backoff(attempt):
+    """Full-jitter exponential backoff, so parallel workers do not retry in step"""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+class CircuitBreaker:
+    """Fails calls fast after repeated 5xx responses or connection errors.
+
+    After `threshold` consecutive failures the circuit opens for `cooldown`
+    seconds; then one call is let through and its outcome closes or reopens
+    it. `trips` counts openings so batch jobs can stop early.
+    """
+
+    def __init__(self, threshold=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    def before(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.cooldown:
+                raise CircuitOpenError(f"GitHub API unavailable ({self.failures} consecutive failures)")
+            # Half-open: let this call through; a failure reopens at once
+            self.failures = self.threshold - 1
+            self.opened_at = None
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold and self.opened_at is None:
+                self.opened_at = time.monotonic()
+                self.trips += 1
+
+breaker = CircuitBreaker()
@@ -0,0 +1,151 @@
+import re
+
+import gh_client
+from records import Comment, Issue
+
+# Everything an issue/comment event needs, in one query. Team rosters are
+# appended as aliased fields (see team_fields) since their number varies.
+ISSUE_QUERY = """
+query($owner: String!, $name: String!, $number: Int!, $org: String!, $author: String!, $cursor: String) {
+  repository(owner: $owner, name: $name) {
+    issue(number: $number) {
+      number
+      state
+      labels(first: 100) { nodes { name } }
+      comments(first: 100, after: $cursor) {
+        pageInfo { hasNextPage endCursor }
+        nodes { databaseId body createdAt updatedAt author { login __typename } }
+      }
+    }
+  }
+  user(login: $author) { databaseId organization(login: $org) { login } }
+%s}
+"""
+
+TEAM_FIELD = """  %s: organization(login: $org) {
+    team(slug: "%s") {
+      members(first: 100%s) {
+        pageInfo { hasNextPage endCursor }
+        nodes { login }
+      }
+    }
+  }
+"""
+
+COMMENTS_QUERY = """
+query($owner: String!, $name: String!, $number: Int!, $cursor: String) {
+  repository(owner: $owner, name: $name) {
+    issue(number: $number) {
+      comments(first: 100, after: $cursor) {
+        pageInfo { hasNextPage endCursor }
+        nodes { databaseId body createdAt updatedAt author { login __typename } }
+      }
+    }
+  }
+}
+"""
+
+TEAM_QUERY = """
+query($org: String!) {
+%s}
+"""
+
+USERS_QUERY = """
+query {
+%s}
+"""
+
+USER_FIELD = """  u%d: user(login: "%s") { login databaseId }
+"""
+
+SLUG_RE = re.compile(r"^[A-Za-z0-9_.-]+$")
+LOGIN_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9-]{0,38}$")
+
+def team_fields(team_cursors):
+    fields = []
+    for i, (slug, cursor) in enumerate(team_cursors):
+        if not SLUG_RE.match(slug):
+            raise ValueError(f"Invalid team slug: {slug!r}")
+        after = f', after: "{cursor}"' if cursor else ""
+        fields.append(TEAM_FIELD % (f"t{i}", slug, after))
+    return "".join(fields)
+
+def to_comment(node):
+    # Same record as the REST comment listings produce
+    author = node.get("author") or {}
+    return Comment(node.get("databaseId"), author.get("login"), author.get("__typename"),
+                   node.get("body") or "", node.get("createdAt") or "", node.get("updatedAt") or "")
+
+def fetch_issue_context(token, org, repo, issue_number, author, team_slugs=(), user_agent="join-org-action"):
+    """Fetch an issue's labels and comments, the author's id and org membership
+    and the given team rosters in one query (plus follow-ups for long lists).
+
+    `author_is_member` is True when GraphQL shows the membership and None when
+    it cannot tell (private memberships may be hidden), so callers should fall
+    back to the REST probe in that case.
+    """
+    owner, name = repo.split("/", 1)
+    slugs = [s.strip() for s in team_slugs if s.strip()]
+    variables = {"owner": owner, "name": name, "number": issue_number, "org": org, "author": author, "cursor": None}
+    data = gh_client.graphql(ISSUE_QUERY % team_fields([(s, None) for s in slugs]), variables, token, user_agent=user_agent)
+
+    issue = (data.get("repository") or {}).get("issue")
+    if not issue:
+        raise RuntimeError(f"Fetch issue failed: #{issue_number} not found")
+
+    comments = [to_comment(n) for n in issue["comments"]["nodes"]]
+    page = issue["comments"]["pageInfo"]
+    while page["hasNextPage"]:
+        more = gh_client.graphql(COMMENTS_QUERY, {"owner": owner, "name": name, "number": issue_number,
+                                                  "cursor": page["endCursor"]}, token, user_agent=user_agent)
+        conn = more["repository"]["issue"]["comments"]
+        comments.extend(to_comment(n) for n in conn["nodes"])
+        page = conn["pageInfo"]
+
+    teams = {}
+    pending = []
+    for i, slug in enumerate(slugs):
+        team = (data.get(f"t{i}") or {}).get("team")
+        if team is None:
+            teams[slug] = set()
+            continue
+        teams[slug] = {n["login"] for n in team["members"]["nodes"]}
+        if team["members"]["pageInfo"]["hasNextPage"]:
+            pending.append((slug, team["members"]["pageInfo"]["endCursor"]))
+    # Only very large teams need more pages; fetch them together per round.
+    while pending:
+        more = gh_client.graphql(TEAM_QUERY % team_fields(pending), {"org": org}, token, user_agent=user_agent)
+        next_pending = []
+        for i, (slug, _) in enumerate(pending):
+            members = more[f"t{i}"]["team"]["members"]
+            teams[slug].update(n["login"] for n in members["nodes"])
+            if members["pageInfo"]["hasNextPage"]:
+                next_pending.append((slug, members["pageInfo"]["endCursor"]))
+        pending = next_pending
+
+    user = data.get("user") or {}
+    return {
+        "issue": Issue(issue["number"], author, [l["name"] for l in issue["labels"]["nodes"]],
+                       state=issue["state"].lower(), comments=len(comments)),
+        "comments": comments,
+        "author_id": user.get("databaseId"),
+        "author_is_member": True if user.get("organization") else None,
+        "teams": teams,
+    }
+
+def resolve_user_ids(token, logins, batch=50, user_agent="join-org-action"):
+    """Map logins (lowercased) to account ids, `batch` users per query.
+
+    Unknown or malformed logins are left out of the result.
+    """
+    valid = sorted({l.strip().lower() for l in logins if LOGIN_RE.match(l.strip())})
+    ids = {}
+    for start in range(0, len(valid), batch):
+        chunk = valid[start:start + batch]
+        data = gh_client.graphql(USERS_QUERY % "".join(USER_FIELD % (i, l) for i, l in enumerate(chunk)),
+                                 {}, token, user_agent=user_agent)
+        for i in range(len(chunk)):
+            user = data.get(f"u{i}")
+            if user and user.get("databaseId"):
+                ids[user["login"].lower()] = int(user["databaseId"])
+    return ids
@@ -0,0 +1,221 @@
+"""join-config.yml, parsed and validated once into immutable lookup tables.
+
+The compiled form is cached under JOIN_CONFIG_CACHE keyed by the file's
+hash, so later runs (and every event in the daemon) skip parsing and
+validation.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import namedtuple
+from pathlib import Path
+from types import MappingProxyType
+
+CONFIG_PATH = os.environ.get("JOIN_CONFIG", ".github/join-config.yml")
+CACHE_DIR = os.environ.get("JOIN_CONFIG_CACHE", ".cache/join-config")
+# Bump when the compiled layout changes so stale cache files are ignored
+VERSION = "1"
+
+TARGET_LABEL_RE = re.compile(r"^target:(.+)$")
+SLUG_RE = re.compile(r"^[A-Za-z0-9_.-]+$")
+MODES = ("auto", "approval")
+
+Target = namedtuple("Target", "name label mode team_slug reviewer_users reviewer_teams reviewer_logins")
+Shard = namedtuple("Shard", "name org repo token_env workers state_file targets label_index")
+
+class Config(namedtuple("Config", "org remind_interval_hours graphql targets label_index "
+                                  "team_slugs reviewer_teams shards")):
+    __slots__ = ()
+
+    def target_for(self, issue):
+        """The configured Target named by the issue's `target:<name>` label, or None"""
+        for label in issue.labels:
+            name = self.label_index.get(label)
+            if name:
+                return self.targets[name]
+        return None
+
+    def for_shard(self, shard):
+        """This config with the shard's own teams, if it has any"""
+        if shard.targets is None:
+            return self
+        return self._replace(targets=shard.targets, label_index=shard.label_index,
+                             team_slugs=frozenset(t.team_slug for t in shard.targets.values() if t.team_slug))
+
+# tiny YAML subset parser for our config
+def load_simple_yaml(path: str) -> dict:
+    return parse_simple_yaml(Path(path).read_text(encoding="utf-8"))
+
+def parse_simple_yaml(text: str) -> dict:
+    lines = [ln.rstrip("\n") for ln in text.splitlines()]
+
+    def parse_value(v: str):
+        v = v.strip()
+        if v.startswith("[") and v.endswith("]"):
+            inner = v[1:-1].strip()
+            if not inner:
+                return []
+            parts = [p.strip() for p in inner.split(",")]
+            out = []
+            for p in parts:
+                # Remove quotes and strip whitespace
+                if (p.startswith('"') and p.endswith('"')) or (p.startswith("'") and p.endswith("'")):
+                    out.append(p[1:-1].strip())
+                else:
+                    out.append(p.strip())
+            return out
+        if (v.startswith('"') and v.endswith('"')) or (v.startswith("'") and v.endswith("'")):
+            return v[1:-1].strip()
+        if v in ("true", "false"):
+            return v == "true"
+        return v.strip()
+
+    root = {}
+    stack = [(0, root)]
+    for ln in lines:
+        if not ln.strip() or ln.strip().startswith("#"):
+            continue
+        # Remove inline comments
+        ln = ln.split("#")[0].rstrip()
+        if not ln.strip():
+            continue
+        indent = len(ln) - len(ln.lstrip(" "))
+        key, _, val = ln.strip().partition(":")
+        key = key.strip()
+        val = val.strip()
+        while stack and indent < stack[-1][0]:
+            stack.pop()
+        cur = stack[-1][1]
+        if val == "":
+            cur[key] = {}
+            stack.append((indent + 2, cur[key]))
+        else:
+            cur[key] = parse_value(val)
+    return root
+
+def compile_targets(teams, where="teams"):
+    if not isinstance(teams, dict):
+        raise ValueError(f"join-config: `{where}` must be a mapping")
+    targets = {}
+    for name, t in teams.items():
+        t = t if isinstance(t, dict) else {}
+        mode = t.get("mode", "auto") or "auto"
+        if mode not in MODES:
+            raise ValueError(f"join-config: {where}.{name}.mode must be one of {', '.join(MODES)}, got {mode!r}")
+        team_slug = (t.get("team_slug") or "").strip()
+        if team_slug and not SLUG_RE.match(team_slug):
+            raise ValueError(f"join-config: {where}.{name}.team_slug is not a valid team slug: {team_slug!r}")
+        reviewers = t.get("reviewers") or {}
+        users = tuple(u.strip().lstrip("@") for u in reviewers.get("users") or [] if u.strip())
+        reviewer_teams = tuple(s.strip() for s in reviewers.get("teams") or [] if s.strip())
+        for slug in reviewer_teams:
+            if not SLUG_RE.match(slug):
+                raise ValueError(f"join-config: {where}.{name}.reviewers.teams has an invalid slug: {slug!r}")
+        label = f"target:{name}"
+        if not TARGET_LABEL_RE.match(label):
+            raise ValueError(f"join-config: invalid target name {name!r}")
+        targets[name] = Target(name, label, mode, team_slug, users, reviewer_teams,
+                               frozenset(u.lower() for u in users))
+    return targets
+
+def compile_config(raw):
+    """Validate the parsed YAML and build the lookup tables"""
+    targets = compile_targets(raw.get("teams") or {})
+    shards = []
+    for name, sh in (raw.get("shards") or {}).items():
+        sh = sh if isinstance(sh, dict) else {}
+        own = compile_targets(sh["teams"], f"shards.{name}.teams") if sh.get("teams") else None
+        workers = sh.get("workers")
+        if workers is not None and not str(workers).isdigit():
+            raise ValueError(f"join-config: shards.{name}.workers must be a number, got {workers!r}")
+        shards.append(Shard(name, (sh.get("org") or "").strip(), (sh.get("repo") or "").strip(),
+                            sh.get("token_env") or "GH_TOKEN", int(workers) if workers else None,
+                            sh.get("state_file") or None, freeze_targets(own),
+                            freeze_index(own)))
+    remind = raw.get("remind_interval_hours") or 24
+    try:
+        remind = float(remind)
+    except ValueError:
+        raise ValueError(f"join-config: remind_interval_hours must be a number, got {remind!r}")
+    return Config(
+        org=(raw.get("org") or "").strip(),
+        remind_interval_hours=remind,
+        graphql=raw.get("graphql") is True,
+        targets=freeze_targets(targets),
+        label_index=freeze_index(targets),
+        team_slugs=frozenset(t.team_slug for t in targets.values() if t.team_slug),
+        reviewer_teams=tuple(sorted({s for t in targets.values() for s in t.reviewer_teams})),
+        shards=tuple(shards),
+    )
+
+def freeze_targets(targets):
+    return None if targets is None else MappingProxyType(dict(targets))
+
+def freeze_index(targets):
+    return None if targets is None else MappingProxyType({t.label: t.name for t in targets.values()})
+
+# --- on-disk cache ------------------------------------------------------
+
+def encode(cfg):
+    def targets(ts):
+        return None if ts is None else [list(t._replace(reviewer_logins=sorted(t.reviewer_logins))) for t in ts.values()]
+    return {
+        "org": cfg.org,
+        "remind_interval_hours": cfg.remind_interval_hours,
+        "graphql": cfg.graphql,
+        "targets": targets(cfg.targets),
+        "shards": [list(s._replace(targets=targets(s.targets), label_index=None)) for s in cfg.shards],
+    }
+
+def decode(data):
+    def targets(rows):
+        if rows is None:
+            return None
+        return {r[0]: Target(*r[:4], tuple(r[4]), tuple(r[5]), frozenset(r[6])) for r in rows}
+    ts = targets(data["targets"])
+    shards = []
+    for row in data["shards"]:
+        own = targets(row[6])
+        shards.append(Shard(*row[:6], freeze_targets(own), freeze_index(own)))
+    return Config(
+        org=data["org"],
+        remind_interval_hours=data["remind_interval_hours"],
+        graphql=data["graphql"],
+        targets=freeze_targets(ts),
+        label_index=freeze_index(ts),
+        team_slugs=frozenset(t.team_slug for t in ts.values() if t.team_slug),
+        reviewer_teams=tuple(sorted({s for t in ts.values() for s in t.reviewer_teams})),
+        shards=tuple(shards),
+    )
+
+_memo = {}
+_memo_lock = threading.Lock()
+
+def load_config(path=CONFIG_PATH):
+    """The compiled config for `path`, from memory, the disk cache or a fresh compile"""
+    data = Path(path).read_bytes()
+    key = hashlib.sha256(VERSION.encode() + b"\0" + data).hexdigest()[:24]
+    with _memo_lock:
+        if key in _memo:
+            return _memo[key]
+    cache_file = Path(CACHE_DIR) / f"{key}.json"
+    cfg = None
+    if cache_file.exists():
+        try:
+            cfg = decode(json.loads(cache_file.read_text(encoding="utf-8")))
+        except (ValueError, KeyError, IndexError, TypeError):
+            cfg = None
+    if cfg is None:
+        cfg = compile_config(parse_simple_yaml(data.decode("utf-8")))
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = cache_file.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(encode(cfg), ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, cache_file)
+        except OSError:
+            pass  # a read-only checkout still works, just without the cache
+    with _memo_lock:
+        _memo[key] = cfg
+    return cfg
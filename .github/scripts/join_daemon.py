@@ -0,0 +1,225 @@
+"""Long-running alternative to the join-org workflow.
+
+Receives `issues` / `issue_comment` webhooks on a local HTTP listener,
+verifies X-Hub-Signature-256 and hands each event to join_org's handler.
+Events for different issues run concurrently; events for the same issue run
+one at a time in arrival order. Config and the membership snapshot stay
+loaded between events.
+
+    WEBHOOK_SECRET=... GH_TOKEN=... ORG=... REPO=... python .github/scripts/join_daemon.py
+
+Without WEBHOOK_SECRET the daemon refuses to start, since anyone who can
+reach the port could otherwise forge /approve comments; pass
+--insecure-no-signature to run unsigned (local testing only).
+
+GET /healthz returns the queue counters as JSON.
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import signal
+import sys
+import time
+import traceback
+from http import HTTPStatus
+
+import gh_client
+import join_config
+import join_org
+from membership import MembershipSnapshot
+
+# Largest payload GitHub sends
+MAX_BODY = 25 * 1024 * 1024
+
+def verify_signature(secret, body, signature, insecure=False):
+    """Check X-Hub-Signature-256; without a secret only `insecure` accepts"""
+    if not secret:
+        return insecure
+    expected = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature or "")
+
+def event_from_webhook(name, payload):
+    """join_org event dict for a webhook, or None when the workflow would skip it"""
+    issue = payload.get("issue") or {}
+    labels = [l.get("name") for l in issue.get("labels") or []]
+    if "join-request" not in labels:
+        return None
+    action = payload.get("action", "")
+    comment = payload.get("comment") or {}
+    if name == "issues" and action == "opened":
+        pass
+    elif name == "issue_comment" and action == "created":
+        if (comment.get("user") or {}).get("type") == "Bot" or "/approve" not in (comment.get("body") or ""):
+            return None
+    else:
+        return None
+    return {
+        "repo": (payload.get("repository") or {}).get("full_name", ""),
+        "issue_number": issue["number"],
+        "author": issue["user"]["login"],
+        "action": action,
+        "name": name,
+        "label": (payload.get("label") or {}).get("name", ""),
+        "comment_body": comment.get("body", ""),
+        "actor": (payload.get("sender") or {}).get("login", ""),
+    }
+
+class Daemon:
+    def __init__(self, token, org, repo, secret, workers=8, snapshot_ttl=300, insecure=False):
+        self.token = token
+        self.org = org
+        self.repo = repo
+        self.secret = secret
+        self.insecure = insecure
+        self.snapshot_ttl = snapshot_ttl
+        self.slots = asyncio.Semaphore(workers)
+        # Per-issue [lock, pending events]; asyncio locks wake waiters in FIFO order
+        self.issue_locks = {}
+        self.tasks = set()
+        self.stats = {"received": 0, "queued": 0, "done": 0, "failed": 0, "ignored": 0, "rejected": 0}
+        self._members = None
+        self._members_at = 0.0
+
+    def members(self):
+        # Rosters change outside our view (accepted invites, manual edits);
+        # start a fresh snapshot after snapshot_ttl seconds
+        if self._members is None or time.monotonic() - self._members_at > self.snapshot_ttl:
+            self._members = MembershipSnapshot(self.token, self.org, user_agent=join_org.USER_AGENT)
+            self._members_at = time.monotonic()
+        return self._members
+
+    def submit(self, event):
+        self.stats["queued"] += 1
+        task = asyncio.get_running_loop().create_task(self.run(event))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def run(self, event):
+        key = (event["repo"], event["issue_number"])
+        entry = self.issue_locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        lock = entry[0]
+        try:
+            async with lock:
+                async with self.slots:
+                    # Compiled once per config file version, so edits apply
+                    # without a restart
+                    config, members = join_config.load_config(), self.members()
+                    await asyncio.to_thread(join_org.process_event, self.token, self.org,
+                                            event["repo"], config, members, event)
+            self.stats["done"] += 1
+        except Exception:
+            self.stats["failed"] += 1
+            print(f"event for {key[0]}#{key[1]} failed:\n{traceback.format_exc()}", file=sys.stderr)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self.issue_locks[key]
+
+    def handle_webhook(self, headers, body):
+        """Returns (status, message)"""
+        self.stats["received"] += 1
+        if not verify_signature(self.secret, body, headers.get("x-hub-signature-256"), self.insecure):
+            self.stats["rejected"] += 1
+            return 401, "bad signature"
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return 400, "bad json"
+        event = event_from_webhook(headers.get("x-github-event", ""), payload)
+        if event and event["repo"].lower() != self.repo.lower():
+            event = None
+        if not event:
+            self.stats["ignored"] += 1
+            return 204, ""
+        self.submit(event)
+        return 202, "queued"
+
+    async def serve_client(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = (await reader.readline()).decode("latin-1").strip()
+                    if not line:
+                        break
+                    k, _, v = line.partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY:
+                    await self.respond(writer, 413, "too large", close=True)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                if method == "GET" and path == "/healthz":
+                    status, text = 200, json.dumps(dict(self.stats, active=len(self.tasks)))
+                elif method == "POST":
+                    status, text = self.handle_webhook(headers, body)
+                else:
+                    status, text = 404, "not found"
+                close = headers.get("connection", "").lower() == "close"
+                await self.respond(writer, status, text, close=close)
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, text, close=False):
+        data = text.encode()
+        head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\nContent-Type: text/plain\r\nContent-Length: {len(data)}\r\n"
+                f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + data)
+        await writer.drain()
+
+    async def drain(self):
+        while self.tasks:
+            await asyncio.gather(*list(self.tasks), return_exceptions=True)
+
+async def serve(daemon, host, port):
+    server = await asyncio.start_server(daemon.serve_client, host, port)
+    print(f"listening on {host}:{server.sockets[0].getsockname()[1]}", flush=True)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+    # Stop accepting, finish what is queued, then drop the pooled connections
+    server.close()
+    await server.wait_closed()
+    await daemon.drain()
+    gh_client.close_all()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve join-org webhooks.")
+    parser.add_argument("--insecure-no-signature", action="store_true",
+                        help="accept unsigned webhooks when WEBHOOK_SECRET is not set (local testing only)")
+    args = parser.parse_args()
+
+    secret = os.environ.get("WEBHOOK_SECRET", "")
+    if not secret and not args.insecure_no_signature:
+        raise SystemExit("WEBHOOK_SECRET is not set; refusing to accept unsigned webhooks "
+                         "(use --insecure-no-signature for local testing)")
+    daemon = Daemon(
+        token=os.environ["GH_TOKEN"],
+        org=os.environ["ORG"],
+        repo=os.environ["REPO"],
+        secret=secret,
+        workers=int(os.environ.get("DAEMON_WORKERS", "8")),
+        snapshot_ttl=float(os.environ.get("DAEMON_SNAPSHOT_TTL", "300")),
+        insecure=args.insecure_no_signature,
+    )
+    if not secret:
+        print("WEBHOOK_SECRET is not set; signatures are not checked", file=sys.stderr)
+    asyncio.run(serve(daemon, os.environ.get("DAEMON_HOST", "127.0.0.1"), int(os.environ.get("DAEMON_PORT", "8787"))))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Plan/apply for batch runs.
+
+A plan is a list of per-issue entries, computed from bulk reads alone:
+
+    {"number", "author", "labels", "updated_at", "member_state", "outcome",
+     "state": "seen" | "remind" | "forget",
+     "actions": [{"type": "invite", "login"}, {"type": "team-add", "team", "login"},
+                 {"type": "comment", "body"}, {"type": "labels", "add", "remove"},
+                 {"type": "close"}]}
+
+apply() runs the actions grouped by type rather than issue by issue: all
+invitations (one batched id lookup, each user once), then all team adds
+(each user/team pair once), then one Outbox flush per issue. An issue
+whose invitation or team add failed gets none of its later actions.
+"""
+import json
+import sys
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import gh_retry
+import issue_graphql
+import join_org
+from outbox import Outbox, WriteError
+from records import Issue
+
+VERSION = 1
+
+def action(kind, **fields):
+    return dict(type=kind, **fields)
+
+def count_actions(entries):
+    return Counter(a["type"] for e in entries for a in e["actions"])
+
+def save_plan(path, shards):
+    """Write the plan as JSON; "-" prints it"""
+    text = json.dumps({"version": VERSION, "shards": shards}, ensure_ascii=False, indent=1)
+    if path == "-":
+        print(text)
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text + "\n")
+
+def load_plan(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != VERSION:
+        raise ValueError(f"{path}: unsupported plan version {data.get('version')!r}")
+    return data["shards"]
+
+def render_plan(shards):
+    lines = ["### Join scan plan", "",
+             "| Shard | Repo | Issues | Invite | Team add | Comment | Labels | Close |",
+             "| --- | --- | ---: | ---: | ---: | ---: | ---: | ---: |"]
+    for sh in shards:
+        counts = count_actions(sh["entries"])
+        lines.append(f"| {sh['name']} | {sh['repo']} | {len(sh['entries'])} | {counts['invite']} | "
+                     f"{counts['team-add']} | {counts['comment']} | {counts['labels']} | {counts['close']} |")
+    return "\n".join(lines)
+
+def fail(entry, kind, detail, response=None):
+    entry["result"] = "failed"
+    entry["failed"] = kind
+    entry["error"] = detail
+    entry["response"] = response
+
+def apply(token, org, repo, entries, workers=4, user_agent="join-org-action", on_failure=None):
+    """Run the plan's actions; each entry with actions gets "result"
+    ("done", "failed" or "stopped") and, on failure, "failed" (the action
+    type), "error" and "response" ([code, payload] when GitHub answered).
+
+    on_failure(entry, box) may queue other writes for an issue whose
+    invitation or team add failed (e.g. a note that it will be retried).
+    """
+    todo = [e for e in entries if e["actions"]]
+    for e in todo:
+        e["result"] = None
+
+    def pending(kind):
+        return [e for e in todo if e["result"] is None and any(a["type"] == kind for a in e["actions"])]
+
+    def run_all(fn, keys):
+        # Stop handing out work once the circuit breaker has opened
+        def run(key):
+            if gh_retry.breaker.trips:
+                return "stopped", None
+            try:
+                return fn(key)
+            except Exception as e:
+                return repr(e), None
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            return dict(zip(keys, pool.map(run, keys)))
+
+    def settle(kind, key_of, results):
+        for e in pending(kind):
+            for a in e["actions"]:
+                if a["type"] != kind:
+                    continue
+                error, response = results[key_of(a)]
+                if error == "stopped":
+                    e["result"] = "stopped"
+                elif error:
+                    fail(e, kind, error, response)
+                if e["result"] is not None:
+                    break
+
+    # Invitations: one id lookup for everyone, one invitation per user
+    invites = {a["login"].lower(): a["login"] for e in pending("invite") for a in e["actions"] if a["type"] == "invite"}
+    if invites:
+        try:
+            ids = issue_graphql.resolve_user_ids(token, list(invites.values()), user_agent=user_agent)
+        except Exception as e:
+            ids = e
+
+        def invite(key):
+            if isinstance(ids, Exception):
+                return f"user lookup failed: {ids!r}", None
+            if key not in ids:
+                return "no such GitHub user", None
+            code, payload = join_org.invite_to_org(token, org, ids[key], invites[key])
+            return (None if code in (201, 202) else f"HTTP {code}"), [code, payload]
+
+        settle("invite", lambda a: a["login"].lower(), run_all(invite, list(invites)))
+
+    # Team adds: each (team, user) pair once
+    adds = {(a["team"], a["login"].lower()): a["login"] for e in pending("team-add")
+            for a in e["actions"] if a["type"] == "team-add"}
+    if adds:
+        def team_add(key):
+            code, payload = join_org.add_user_to_team(token, org, key[0], adds[key])
+            return (None if code in (200, 201) else f"HTTP {code}"), [code, payload]
+
+        settle("team-add", lambda a: (a["team"], a["login"].lower()), run_all(team_add, list(adds)))
+
+    # Comments, labels and closing: one Outbox flush per issue
+    def write(n):
+        e = by_number[n]
+        issue = Issue(e["number"], e["author"], e["labels"], updated_at=e["updated_at"])
+        box = Outbox(token, repo, issue, user_agent=user_agent)
+        if e["result"] == "failed":
+            on_failure(e, box)
+        else:
+            for a in e["actions"]:
+                if a["type"] == "comment":
+                    box.comment(a["body"])
+                elif a["type"] == "labels":
+                    box.add_labels(a.get("add") or [])
+                    box.remove_labels(a.get("remove") or [])
+                elif a["type"] == "close":
+                    box.close()
+        # A refused write marks the entry failed
+        try:
+            box.flush()
+        except WriteError as err:
+            return str(err), [err.status, err.payload]
+        return None, None
+
+    by_number = {}
+    for e in todo:
+        if e["result"] is None or (e["result"] == "failed" and on_failure):
+            by_number[e["number"]] = e
+    for n, (error, response) in run_all(write, list(by_number)).items():
+        e = by_number[n]
+        if e["result"] == "failed":
+            if error:
+                print(f"#{n}: {error}", file=sys.stderr)
+            continue
+        if error == "stopped":
+            e["result"] = "stopped"
+        elif error:
+            fail(e, "issue", error, response)
+        else:
+            e["result"] = "done"
@@ -0,0 +1,129 @@
+import calendar
+import sys
+import threading
+import time
+
+import gh_client
+
+# GitHub expires org invitations after 7 days
+INVITE_TTL_DAYS = 7
+
+def is_expired(created_at, now=None):
+    try:
+        created = calendar.timegm(time.strptime(created_at[:19], "%Y-%m-%dT%H:%M:%S"))
+    except (TypeError, ValueError):
+        return False
+    return (now or time.time()) - created > INVITE_TTL_DAYS * 86400
+
+class MembershipSnapshot:
+    """Org members, pending invitations and team rosters, fetched once per run.
+
+    Every list is paginated in full and stored as a set of lowercase logins,
+    so membership questions are local lookups instead of one API call each.
+    Lists are fetched lazily on first use; call load() to fetch eagerly.
+    """
+
+    def __init__(self, token, org, user_agent="join-org-action"):
+        self.token = token
+        self.org = org
+        self.user_agent = user_agent
+        self._lock = threading.Lock()
+        self._org_members = None
+        self._invitations = None
+        self._failed = None
+        self._teams = {}
+        self._team_pending = {}
+
+    def _logins(self, path):
+        logins = gh_client.paginate(f"{path}?per_page=100", self.token, user_agent=self.user_agent,
+                                    project=lambda it: it.get("login"))
+        return {login.lower() for login in logins if login}
+
+    def _team_logins(self, slug, what):
+        # A misspelled or inaccessible team must not break the rest (e.g.
+        # the user reviewers); treat it as empty, as get_team_members() did
+        try:
+            return self._logins(f"orgs/{self.org}/teams/{slug}/{what}")
+        except RuntimeError as e:
+            print(f"cannot list {what} of team {self.org}/{slug}: {e}", file=sys.stderr)
+            return set()
+
+    def load(self, team_slugs=()):
+        self.org_members()
+        self.invitations()
+        for slug in team_slugs:
+            self.team_members(slug)
+            self.team_pending(slug)
+        return self
+
+    def org_members(self):
+        with self._lock:
+            if self._org_members is None:
+                self._org_members = self._logins(f"orgs/{self.org}/members")
+            return self._org_members
+
+    def invitations(self):
+        """Pending org invitations: login -> created_at"""
+        with self._lock:
+            if self._invitations is None:
+                items = gh_client.paginate(f"orgs/{self.org}/invitations?per_page=100", self.token,
+                                           user_agent=self.user_agent,
+                                           project=lambda it: (it.get("login"), it.get("created_at") or ""))
+                # Invitations by email have no login and cannot match an issue author
+                self._invitations = {login.lower(): created for login, created in items if login}
+            return self._invitations
+
+    def failed_invitations(self):
+        """Failed or expired org invitations: login -> failed_reason"""
+        with self._lock:
+            if self._failed is None:
+                items = gh_client.paginate(f"orgs/{self.org}/failed_invitations?per_page=100", self.token,
+                                           user_agent=self.user_agent,
+                                           project=lambda it: (it.get("login"), it.get("failed_reason") or ""))
+                self._failed = {login.lower(): reason for login, reason in items if login}
+            return self._failed
+
+    def team_members(self, team_slug):
+        slug = team_slug.strip().lower()
+        with self._lock:
+            if slug not in self._teams:
+                self._teams[slug] = self._team_logins(slug, "members")
+            return self._teams[slug]
+
+    def team_pending(self, team_slug):
+        slug = team_slug.strip().lower()
+        with self._lock:
+            if slug not in self._team_pending:
+                self._team_pending[slug] = self._team_logins(slug, "invitations")
+            return self._team_pending[slug]
+
+    def seed_team(self, team_slug, logins):
+        """Use a roster fetched elsewhere (e.g. by GraphQL) instead of listing it"""
+        with self._lock:
+            self._teams[team_slug.strip().lower()] = {l.lower() for l in logins}
+
+    def is_org_member(self, username):
+        return username.lower() in self.org_members()
+
+    def invite_state(self, username):
+        """"live", "expired", "failed" (declined, cancelled...) or None when never invited.
+
+        Failed invitations are only listed when a user has no live one.
+        """
+        login = username.lower()
+        created = self.invitations().get(login)
+        if created is not None:
+            return "expired" if is_expired(created) else "live"
+        reason = self.failed_invitations().get(login)
+        if reason is None:
+            return None
+        return "expired" if "expire" in reason.lower() else "failed"
+
+    def is_in_team(self, team_slug, username):
+        """Active or pending team membership"""
+        login = username.lower()
+        return login in self.team_members(team_slug) or login in self.team_pending(team_slug)
+
+    def mark_team_member(self, team_slug, username):
+        """Record a successful team add made during this run"""
+        self.team_pending(team_slug).add(username.lower())
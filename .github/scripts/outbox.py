@@ -0,0 +1,129 @@
+import time
+import urllib.parse
+
+import gh_client
+from records import Comment
+
+SEPARATOR = "\n\n---\n\n"
+
+class WriteError(RuntimeError):
+    """A write GitHub refused; `status` and `payload` are its answer"""
+
+    def __init__(self, method, path, status, payload):
+        super().__init__(f"{method} {path}: HTTP {status} {payload}")
+        self.status = status
+        self.payload = payload
+
+class Outbox:
+    """Writes for one issue, collected during a run and flushed together.
+
+    All comments become one new bot comment (a fresh comment notifies the
+    author, an edit would not). Labels are added and removed individually
+    and assignees added, so changes others made meanwhile are kept; a state
+    change is one issue PATCH.
+    """
+
+    def __init__(self, token, repo, issue, user_agent="join-org-action"):
+        # `issue` is a records.Issue; it is kept in step with what we write
+        self.token = token
+        self.repo = repo
+        self.issue = issue
+        self.user_agent = user_agent
+        self.comments = []
+        self.labels_add = []
+        self.labels_remove = []
+        self.assignees = []
+        self.state = None
+
+    @property
+    def number(self):
+        return self.issue.number
+
+    def comment(self, body):
+        if body not in self.comments:
+            self.comments.append(body)
+
+    def add_labels(self, labels):
+        self.labels_add += [l for l in labels if l not in self.labels_add]
+        self.labels_remove = [l for l in self.labels_remove if l not in labels]
+
+    def remove_labels(self, labels):
+        self.labels_remove += [l for l in labels if l not in self.labels_remove]
+        self.labels_add = [l for l in self.labels_add if l not in labels]
+
+    def set_assignees(self, assignees):
+        self.assignees += [a for a in assignees if a not in self.assignees]
+
+    def close(self):
+        self.state = "closed"
+
+    def gh(self, method, path, body=None, ok=None, verify=None):
+        """Send one write; raises WriteError unless the answer is 2xx (or in `ok`)"""
+        code, payload = gh_client.gh(method, path, self.token, body, user_agent=self.user_agent, verify=verify)
+        if not (200 <= code < 300 or code in (ok or ())):
+            raise WriteError(method, path, code, payload)
+        return code, payload
+
+    def flush_comment(self):
+        if not self.comments:
+            return
+        body = SEPARATOR.join(self.comments)
+        # A minute of slack for clock skew between us and GitHub
+        since = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() - 60))
+        self.gh("POST", f"repos/{self.repo}/issues/{self.number}/comments", {"body": body},
+                verify=lambda: self.find_posted(body, since))
+
+    def find_posted(self, body, since):
+        """(201, comment) if `body` was posted after `since`: a comment POST
+        whose answer was lost may still have gone through"""
+        path = f"repos/{self.repo}/issues/{self.number}/comments?per_page=100&since={since}"
+        for cmt in gh_client.paginate(path, self.token, user_agent=self.user_agent, project=Comment.from_json):
+            if cmt.body == body:
+                return 201, {"id": cmt.id}
+        return None
+
+    def flush_issue(self):
+        current = list(self.issue.labels)
+        # Labels are added and removed one by one rather than PATCHed as a
+        # full list: the issue we hold may be minutes old, and a full list
+        # would revert labels others changed in the meantime.
+        add = [l for l in self.labels_add if l not in current]
+        remove = [l for l in self.labels_remove if l in current]
+        if add:
+            self.gh("POST", f"repos/{self.repo}/issues/{self.number}/labels", {"labels": add})
+            current += add
+        for label in remove:
+            # 404: the label is already gone
+            self.gh("DELETE", f"repos/{self.repo}/issues/{self.number}/labels/{urllib.parse.quote(label, safe='')}",
+                    ok=(404,))
+            current.remove(label)
+        self.issue.labels = tuple(current)
+        # Assignees are only ever added (POST), never PATCHed as a full list
+        # built from our possibly stale copy; skip those already assigned.
+        known = self.issue.assignees or ()
+        new = [a for a in self.assignees if a not in known]
+        failed = None
+        if new:
+            try:
+                self.gh("POST", f"repos/{self.repo}/issues/{self.number}/assignees", {"assignees": new})
+                self.issue.assignees = tuple(known) + tuple(new)
+            except WriteError as e:
+                # A refused assignment must not keep the issue from closing
+                failed = e
+        if self.state and self.state != self.issue.state:
+            self.gh("PATCH", f"repos/{self.repo}/issues/{self.number}", {"state": self.state})
+            self.issue.state = self.state
+        if failed:
+            raise failed
+
+    def flush(self):
+        """Send everything collected so far: at most one comment, the label
+        adds and removals, one assignee POST and one state PATCH.
+
+        Raises WriteError when GitHub refuses a write, so callers do not
+        take an unwritten comment or an issue left open as done.
+        """
+        # Comment first, so a closing note lands before the issue closes
+        self.flush_comment()
+        self.flush_issue()
+        self.comments, self.labels_add, self.labels_remove, self.assignees, self.state = [], [], [], [], None
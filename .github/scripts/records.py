@@ -0,0 +1,58 @@
+"""Compact records for the API objects the scripts keep around.
+
+GitHub's issue and comment payloads carry dozens of fields; we read
+a handful. Lists are projected into these __slots__ records as they are
+decoded (gh_client.paginate(..., project=Issue.from_json)), so memory stays
+flat however many pages a scan walks.
+"""
+
+class Issue:
+    __slots__ = ("number", "author", "labels", "state", "updated_at", "comments", "assignees")
+
+    def __init__(self, number, author, labels=(), state="open", updated_at="", comments=0, assignees=None):
+        self.number = number
+        self.author = author
+        self.labels = tuple(labels)
+        self.state = state
+        self.updated_at = updated_at
+        self.comments = comments
+        # None when not known (e.g. rebuilt from the scan state)
+        self.assignees = None if assignees is None else tuple(assignees)
+
+    @classmethod
+    def from_json(cls, d):
+        return cls(
+            number=d["number"],
+            author=(d.get("user") or {}).get("login", ""),
+            labels=[l["name"] for l in d.get("labels") or []],
+            state=d.get("state", "open"),
+            updated_at=d.get("updated_at") or "",
+            comments=d.get("comments") or 0,
+            assignees=[a["login"] for a in d["assignees"]] if "assignees" in d else None,
+        )
+
+    def has_label(self, name):
+        return name in self.labels
+
+    def __repr__(self):
+        return f"Issue(#{self.number} by {self.author}, {self.state}, {list(self.labels)})"
+
+class Comment:
+    __slots__ = ("id", "author", "author_type", "body", "created_at", "updated_at")
+
+    def __init__(self, id, author, author_type, body, created_at, updated_at):
+        self.id = id
+        self.author = author
+        self.author_type = author_type
+        self.body = body
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+    @classmethod
+    def from_json(cls, d):
+        user = d.get("user") or {}
+        return cls(d.get("id"), user.get("login"), user.get("type"), d.get("body") or "",
+                   d.get("created_at") or "", d.get("updated_at") or "")
+
+    def __repr__(self):
+        return f"Comment({self.id} by {self.author})"
@@ -1,176 +1,407 @@
+"""Scan open join issues: remind, re-invite, finish team adds and close.
+
+    python .github/scripts/scan_join_issues.py                 # plan and apply
+    python .github/scripts/scan_join_issues.py --plan plan.json  # read-only
+    python .github/scripts/scan_join_issues.py --apply plan.json
+
+Each run first builds a plan from bulk reads only (issue listing, org and
+team rosters, invitations), then applies it grouped by action type (see
+join_plan). --plan stops after the first step and saves the plan for
+review; --apply runs a saved plan.
+"""
+import argparse
 import json
 import os
-import re
+import sys
+import time
 import urllib.parse
-import urllib.request
-import urllib.error
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-API = "https://api.github.com"
-
-def gh(method: str, path: str, token: str, body=None):
-    url = f"{API}/{path.lstrip('/')}"
-    headers = {
-        "Accept": "application/vnd.github+json",
-        "Authorization": f"Bearer {token}",
-        "User-Agent": "join-org-scan",
-    }
-    data = None
-    if body is not None:
-        data = json.dumps(body).encode("utf-8")
-        headers["Content-Type"] = "application/json"
-    req = urllib.request.Request(url, headers=headers, data=data, method=method)
-    try:
-        with urllib.request.urlopen(req) as resp:
-            raw = resp.read().decode("utf-8")
-            return resp.status, (json.loads(raw) if raw else None)
-    except urllib.error.HTTPError as e:
-        raw = e.read().decode("utf-8")
-        try:
-            payload = json.loads(raw) if raw else None
-        except Exception:
-            payload = raw
-        return e.code, payload
-
-def comment(token, repo, issue_number, body):
-    gh("POST", f"repos/{repo}/issues/{issue_number}/comments", token, {"body": body})
-
-def close_issue(token, repo, issue_number):
-    gh("PATCH", f"repos/{repo}/issues/{issue_number}", token, {"state": "closed"})
-
-def has_label(issue, name):
-    return any(l["name"] == name for l in issue.get("labels", []))
-
-def get_target_from_labels(issue):
-    for l in issue.get("labels", []):
-        m = re.match(r"^target:(.+)$", l["name"])
-        if m:
-            return m.group(1)
-    return ""
-
-def is_org_member(token, org, username):
-    code, _ = gh("GET", f"orgs/{org}/members/{username}", token)
-    return code == 204
-
-def add_user_to_team(token, org, team_slug, username):
-    return gh("PUT", f"orgs/{org}/teams/{team_slug}/memberships/{username}", token, {"role": "member"})
-
-def is_user_in_team(token, org, team_slug, username):
-    code, payload = gh("GET", f"orgs/{org}/teams/{team_slug}/memberships/{username}", token)
-    return code == 200 and payload and payload.get("state") in ("active", "pending")
-
-def load_simple_yaml(path: str) -> dict:
-    text = Path(path).read_text(encoding="utf-8")
-    lines = [ln.rstrip("\n") for ln in text.splitlines()]
-
-    def parse_value(v: str):
-        v = v.strip()
-        if v.startswith("[") and v.endswith("]"):
-            inner = v[1:-1].strip()
-            if not inner:
-                return []
-            parts = [p.strip() for p in inner.split(",")]
-            out = []
-            for p in parts:
-                if (p.startswith('"') and p.endswith('"')) or (p.startswith("'") and p.endswith("'")):
-                    out.append(p[1:-1])
-                else:
-                    out.append(p)
-            return out
-        if (v.startswith('"') and v.endswith('"')) or (v.startswith("'") and v.endswith("'")):
-            return v[1:-1]
-        if v in ("true", "false"):
-            return v == "true"
-        return v
-
-    root = {}
-    stack = [(0, root)]
-    for ln in lines:
-        if not ln.strip() or ln.strip().startswith("#"):
-            continue
-        # Remove inline comments
-        ln = ln.split("#")[0].rstrip()
-        if not ln.strip():
-            continue
-        indent = len(ln) - len(ln.lstrip(" "))
-        key, _, val = ln.strip().partition(":")
-        val = val.strip()
-        while stack and indent < stack[-1][0]:
-            stack.pop()
-        cur = stack[-1][1]
-        if val == "":
-            cur[key] = {}
-            stack.append((indent + 2, cur[key]))
-        else:
-            cur[key] = parse_value(val)
-    return root
+import gh_client
+import gh_retry
+import join_config
+import join_plan
+from join_plan import action
+from membership import MembershipSnapshot
+from records import Issue
+from scan_state import ScanState, hours_since, shift_minutes, utc_now
 
-def list_open_join_issues(token, repo):
+USER_AGENT = "join-org-scan"
+SCAN_WORKERS = int(os.environ.get("SCAN_WORKERS", "8") or 8)
+SCAN_STATE_FILE = os.environ.get("SCAN_STATE_FILE", ".cache/join-scan-state.jsonl")
+# Re-list issues this long before the last listing, to absorb clock skew
+SINCE_OVERLAP_MINUTES = 5
+# Incremental scans still list every open issue this often, so issues that
+# were deleted, transferred or unlabelled drop out of the state
+SCAN_FULL_EVERY_HOURS = float(os.environ.get("SCAN_FULL_EVERY_HOURS", "168") or 168)
+# Most expired invitations re-sent per shard and run
+SCAN_REINVITE_MAX = int(os.environ.get("SCAN_REINVITE_MAX", "100") or 0)
+
+def search_open_join_issues(token, repo):
+    """Yield every open join issue via the search API (rate limited to
+    30/min, lags behind and stops at 1000 results; kept as a fallback)"""
     # search API: repo:OWNER/REPO is:issue is:open label:join-request
     q = f"repo:{repo} is:issue is:open label:join-request"
-    code, payload = gh("GET", f"search/issues?q={urllib.parse.quote(q)}&per_page=100", token)
-    if code != 200:
-        raise RuntimeError(f"Search failed: {code} {payload}")
-    return payload.get("items", [])
+    yield from gh_client.paginate(f"search/issues?q={urllib.parse.quote(q)}&per_page=100", token,
+                                  user_agent=USER_AGENT, project=Issue.from_json)
+
+def list_join_issues(token, repo, state="open", since=""):
+    """Yield join issues from the repository issue listing, page by page.
+
+    `since` limits the listing to issues updated at or after that time.
+    """
+    path = f"repos/{repo}/issues?labels=join-request&state={state}&sort=updated&direction=asc&per_page=100"
+    if since:
+        path += f"&since={since}"
+    # The issues endpoint also returns pull requests
+    project = lambda it: None if "pull_request" in it else Issue.from_json(it)
+    for it in gh_client.paginate(path, token, user_agent=USER_AGENT, project=project):
+        if it is not None:
+            yield it
+
+def stored_issue(rec):
+    # Rebuild the issue record process_issue() reads from a state record
+    return Issue(rec["number"], rec.get("author", ""), rec.get("labels", []), updated_at=rec.get("updated_at", ""))
+
+def load_shards(config):
+    """The org/repo pairs to scan.
+
+    Without a `shards:` section this is the single ORG/REPO from the
+    environment (ORG falls back to the config's `org:`).
+    """
+    shards = []
+    for sh in config.shards:
+        shards.append({
+            "name": sh.name,
+            "org": sh.org,
+            "repo": sh.repo,
+            "token": os.environ.get(sh.token_env, "").strip(),
+            "token_env": sh.token_env,
+            "config": config.for_shard(sh),
+            "workers": sh.workers or SCAN_WORKERS,
+            "state_file": sh.state_file or str(Path(SCAN_STATE_FILE).with_name(f"join-scan-state-{sh.name}.jsonl")),
+        })
+    if not shards:
+        shards.append({
+            "name": "default",
+            "org": os.environ.get("ORG", "").strip() or config.org,
+            "repo": os.environ.get("REPO", "").strip(),
+            "token": os.environ.get("GH_TOKEN", "").strip(),
+            "token_env": "GH_TOKEN",
+            "config": config,
+            "workers": SCAN_WORKERS,
+            "state_file": SCAN_STATE_FILE,
+        })
+    for sh in shards:
+        if not sh["token"]:
+            raise ValueError(f"Environment variable {sh['token_env']} is not set or empty (shard {sh['name']})")
+        if not sh["org"]:
+            raise ValueError("Organization (org) is not set in environment variable ORG or config file .github/join-config.yml")
+        if not sh["repo"]:
+            raise ValueError(f"Repository (repo) is not set for shard {sh['name']} (environment variable REPO)")
+    return shards
 
 def main():
+    parser = argparse.ArgumentParser(description="Scan open join issues and close the completed ones.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--plan", metavar="FILE",
+                      help="only compute the actions and save them as JSON (- prints them); nothing is changed")
+    mode.add_argument("--apply", metavar="FILE", help="run the actions of a plan saved with --plan")
+    args = parser.parse_args()
+
     # Load configuration first
-    cfg = load_simple_yaml(".github/join-config.yml")
-    
-    # Get environment variables
-    token = os.environ.get("GH_TOKEN", "").strip()
-    repo = os.environ.get("REPO", "").strip()
-    
-    # Prefer org from environment, fallback to config file
-    org = os.environ.get("ORG", "").strip() or cfg.get("org", "").strip()
-    
-    if not token:
-        raise ValueError("Environment variable GH_TOKEN is not set or empty")
-    if not org:
-        raise ValueError("Organization (org) is not set in environment variable ORG or config file .github/join-config.yml")
-    if not repo:
-        raise ValueError("Environment variable REPO is not set or empty")
-
-    teams_cfg = cfg.get("teams") or {}
-
-    issues = list_open_join_issues(token, repo)
-
-    for it in issues:
-        issue_number = it["number"]
-        author = it["user"]["login"]
-
-        target = get_target_from_labels(it)
-        if not target or target not in teams_cfg:
-            continue
+    config = join_config.load_config()
+    shards = load_shards(config)
+    remind_hours = float(os.environ.get("REMIND_INTERVAL_HOURS", "") or config.remind_interval_hours)
 
-        team_cfg = teams_cfg[target]
-        team_slug = team_cfg.get("team_slug", "") or ""
+    if args.apply:
+        planned = {sh["name"]: sh for sh in join_plan.load_plan(args.apply)}
+        for sh in shards:
+            p = planned.pop(sh["name"], None)
+            if p is not None and (p["org"], p["repo"]) != (sh["org"], sh["repo"]):
+                raise SystemExit(f"{args.apply}: shard {sh['name']} is {p['org']}/{p['repo']} in the plan, "
+                                 f"{sh['org']}/{sh['repo']} in the config")
+            sh["plan"] = p
+        if planned:
+            raise SystemExit(f"{args.apply}: unknown shard(s) {', '.join(planned)}")
+        shards = [sh for sh in shards if sh["plan"] is not None]
 
-        # If not org member yet, remind and keep open
-        if not is_org_member(token, org, author):
-            if has_label(it, "invited"):
-                comment(token, repo, issue_number,
-                        f"@{author} 温馨提示：你还未加入 **@{org}**。请在这里接受邀请：\n\nhttps://github.com/orgs/{org}/invitation")
-            continue
+    # Shards run in parallel, each with its own worker pool; gh_client keeps
+    # one rate limiter per token, so shards with their own token also get
+    # their own budget.
+    run = lambda sh: scan_shard(sh, remind_hours, plan_only=bool(args.plan))
+    if len(shards) == 1:
+        results = [run(shards[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+            results = list(pool.map(run, shards))
+
+    if args.plan:
+        plans = [{"name": r["name"], "org": r["org"], "repo": r["repo"], "issues": r["issues"],
+                  "entries": r["plan"]} for r in results]
+        join_plan.save_plan(args.plan, plans)
+        report = join_plan.render_plan(plans)
+    else:
+        report = render_report(results)
+    print(report, file=sys.stderr if args.plan == "-" else sys.stdout)
+    summary = os.environ.get("GITHUB_STEP_SUMMARY", "").strip()
+    if summary:
+        with open(summary, "a", encoding="utf-8") as f:
+            f.write(report + "\n")
+
+    errors = [r for r in results if r["failures"] or r["stopped"] or r["error"]]
+    if errors:
+        raise SystemExit("; ".join(
+            f"{r['name']}: " + (r["error"] or ("stopped early" if r["stopped"] else
+                                f"{len(r['failures'])} issue(s) failed: {', '.join(f'#{n}' for n in r['failures'])}"))
+            for r in errors))
+
+def render_report(results):
+    lines = ["### Join scan", "",
+             "| Shard | Repo | Issues | Closed | Reminded | Reinvited | Skipped | Failed | Seconds |",
+             "| --- | --- | ---: | ---: | ---: | ---: | ---: | ---: | ---: |"]
+    for r in results:
+        counts = r["outcomes"]
+        status = r["error"] or ("stopped early" if r["stopped"] else "")
+        lines.append(f"| {r['name']} | {r['repo']} | {r['issues']} | {counts.get('closed', 0)} | "
+                     f"{counts.get('reminded', 0)} | {counts.get('reinvited', 0)} | "
+                     f"{counts.get('skipped', 0)} | {len(r['failures'])} | "
+                     f"{r['seconds']}{' (' + status + ')' if status else ''} |")
+    return "\n".join(lines)
+
+def scan_shard(shard, remind_hours, plan_only=False):
+    """Scan one org/repo; returns its result for the merged report"""
+    started = time.monotonic()
+    result = {"name": shard["name"], "org": shard["org"], "repo": shard["repo"], "issues": 0,
+              "outcomes": Counter(), "failures": [], "stopped": False, "error": "", "seconds": 0.0, "plan": []}
+    try:
+        run_shard(shard, remind_hours, result, plan_only)
+    except Exception as e:
+        # One broken shard must not take the others down
+        result["error"] = f"{type(e).__name__}: {e}"
+        print(f"[{shard['name']}] {e!r}", file=sys.stderr)
+    result["seconds"] = round(time.monotonic() - started, 2)
+    return result
+
+def run_shard(shard, remind_hours, result, plan_only=False):
+    token, org, repo = shard["token"], shard["org"], shard["repo"]
+    config = shard["config"]
+    name = shard["name"]
 
-        # If needs team, ensure team membership
-        if team_slug:
-            if not is_user_in_team(token, org, team_slug, author):
-                code, payload = add_user_to_team(token, org, team_slug, author)
-                if code not in (200, 201):
-                    # Can't add team for some reason; leave a note and continue
-                    comment(token, repo, issue_number,
-                            f"@{author} 已检测到你已加入 **@{org}**，但加入 **@{org}/{team_slug}** 仍失败，将稍后重试。\n\n"
-                            f"HTTP {code}\n\n```json\n{json.dumps(payload, ensure_ascii=False, indent=2)}\n```")
-                    continue
-
-        # Now complete: comment + close
-        if team_slug:
-            comment(token, repo, issue_number, f"@{author} ✅ 已确认你已加入 **@{org}** 并加入 **@{org}/{team_slug}**，本 Issue 将关闭。")
+    # What we saw last run: unchanged issues are skipped and reminders are
+    # limited to one per interval.
+    state = ScanState(shard["state_file"])
+
+    if shard.get("plan") is not None:
+        # A saved plan: apply it as reviewed, without listing again
+        result["issues"] = shard["plan"]["issues"]
+        entries = shard["plan"]["entries"]
+        apply_entries(token, org, repo, state, entries, shard["workers"], result)
+        state.save()
+        return
+
+    # One bulk snapshot of the org, its invitations and every configured
+    # team answers all membership questions for this run.
+    members = MembershipSnapshot(token, org, user_agent=USER_AGENT).load(config.team_slugs)
+    seen = []
+
+    # Full scans list every open join issue. Incremental scans
+    # (SCAN_INCREMENTAL=1 after a first full scan) only list issues updated
+    # since the last listing and re-check the other known open issues from
+    # the state file, which needs no API calls with the membership snapshot.
+    listed_at = utc_now()
+    use_search = os.environ.get("SCAN_USE_SEARCH", "").lower() in ("1", "true")
+    since = os.environ.get("SCAN_SINCE", "").strip()
+    incremental = (os.environ.get("SCAN_INCREMENTAL", "").lower() in ("1", "true") and state.meta.get("listed_at")
+                   and hours_since(state.meta.get("full_listed_at")) < SCAN_FULL_EVERY_HOURS)
+    if incremental and not since:
+        since = shift_minutes(state.meta["listed_at"], -SINCE_OVERLAP_MINUTES)
+
+    def candidates():
+        if use_search:
+            yield from search_open_join_issues(token, repo)
+            return
+        if not incremental:
+            yield from list_join_issues(token, repo, since=since)
+            return
+        changed = set()
+        for it in list_join_issues(token, repo, state="all", since=since):
+            changed.add(it.number)
+            if it.state == "open":
+                yield it
+            else:
+                state.forget(it.number)
+        for number in state.numbers():
+            if number not in changed:
+                yield stored_issue(state.get(number))
+
+    # Planning needs no per-issue API calls, so it simply follows the
+    # listing page by page. If the circuit breaker opens while listing, the
+    # API is degraded: plan (and apply) only what was listed.
+    entries = []
+    reinvites = SCAN_REINVITE_MAX
+    held = 0
+    stopped = False
+    try:
+        for it in candidates():
+            seen.append(it.number)
+            state.update(it.number, author=it.author, labels=list(it.labels))
+            entry = plan_issue(config, members, state, remind_hours, org, it, reinvite=reinvites > 0)
+            if entry is None:
+                result["outcomes"]["skipped"] += 1
+                continue
+            if entry["outcome"] == "reinvited":
+                reinvites -= 1
+            elif entry["outcome"] == "reinvite-held":
+                held += 1
+            entries.append(entry)
+    except (gh_retry.CircuitOpenError, RuntimeError) as e:
+        if not gh_retry.breaker.trips:
+            raise
+        print(f"[{name}] listing stopped: {e}", file=sys.stderr)
+        stopped = True
+    if SCAN_REINVITE_MAX and held:
+        print(f"[{name}] re-sending {SCAN_REINVITE_MAX} expired invitation(s) this run (SCAN_REINVITE_MAX), "
+              f"{held} more wait for the next run", file=sys.stderr)
+
+    result["issues"] = len(seen)
+    result["plan"] = entries
+    if plan_only:
+        result["stopped"] = stopped
+        return
+
+    apply_entries(token, org, repo, state, entries, shard["workers"], result)
+    stopped = stopped or result["stopped"]
+
+    # A partial listing (since=... or stopped early) does not show every open issue
+    if not since and not stopped:
+        state.prune(seen)
+    if not use_search and not stopped and (not since or incremental):
+        state.meta["listed_at"] = listed_at
+        if not since:
+            state.meta["full_listed_at"] = listed_at
+    state.save()
+    result["stopped"] = stopped
+
+def apply_entries(token, org, repo, state, entries, workers, result):
+    """Apply planned entries and record what happened in the state and result"""
+    name = result["name"]
+
+    def retry_note(entry, box):
+        # A team add that failed is reported on the issue and retried next interval
+        if entry["failed"] != "team-add":
+            return
+        code, payload = entry["response"] or (None, None)
+        team_slug = next(a["team"] for a in entry["actions"] if a["type"] == "team-add")
+        box.comment(f"@{entry['author']} 已检测到你已加入 **@{org}**，但加入 **@{org}/{team_slug}** 仍失败，将稍后重试。\n\n"
+                    f"HTTP {code}\n\n```json\n{json.dumps(payload, ensure_ascii=False, indent=2)}\n```")
+
+    join_plan.apply(token, org, repo, entries, workers=workers, user_agent=USER_AGENT, on_failure=retry_note)
+
+    for e in entries:
+        number, outcome, kind = e["number"], e["outcome"], e["state"]
+        status = e.get("result", "done")
+        if status == "stopped":
+            result["stopped"] = True
+            continue
+        if status == "failed":
+            print(f"[{name}] #{number}: {e['failed']}: {e['error']}", file=sys.stderr)
+            if e["failed"] == "team-add":
+                outcome, kind = "team-retry", "remind"
+            elif e["failed"] == "invite":
+                # Wait an interval before trying this invitation again
+                outcome, kind = "reinvite-failed", "remind"
+                result["failures"].append(number)
+            elif e["failed"] == "issue" and (e["response"] or [None])[0] in (404, 410):
+                # Deleted or transferred since it was listed: stop tracking it
+                outcome, kind = "gone", "forget"
+            else:
+                result["failures"].append(number)
+                continue
+        if kind == "forget":
+            state.forget(number)
+        elif kind == "remind":
+            # Our own comment bumps updated_at; stamp "now" so it doesn't count as a change
+            now = utc_now()
+            state.update(number, updated_at=max(e["updated_at"], now), member_state=e["member_state"],
+                         reminded_at=now)
         else:
-            comment(token, repo, issue_number, f"@{author} ✅ 已确认你已加入 **@{org}**，本 Issue 将关闭。")
+            state.update(number, updated_at=e["updated_at"], member_state=e["member_state"])
+        result["outcomes"][outcome] += 1
+
+def membership_state(members, author, team_slug):
+    if not members.is_org_member(author):
+        # Only a live invitation can still be accepted
+        invite = members.invite_state(author)
+        if invite == "live":
+            return "invited"
+        if invite == "expired":
+            return "invite-expired"
+        return "not-member"
+    if team_slug and not members.is_in_team(team_slug, author):
+        return "org-member"
+    return "member"
+
+def plan_issue(config, members, state, remind_hours, org, it, reinvite=True):
+    """The plan entry for one issue, or None when there is nothing to do.
+
+    Reads only the membership snapshot and the scan state.
+    """
+    target = config.target_for(it)
+    if target is None:
+        return None
+    team_slug = target.team_slug
+
+    # Skip issues where neither the issue nor the author's membership changed
+    # since the last run, unless a reminder/retry is due again.
+    rec = state.get(it.number)
+    observed = membership_state(members, it.author, team_slug)
+    unchanged = rec.get("updated_at", "") >= it.updated_at and rec.get("member_state") == observed
+    # (an hour of slack so a daily cron that starts a bit early still counts)
+    due = hours_since(rec.get("reminded_at")) >= remind_hours - 1
+    if unchanged and not due:
+        return None
+
+    outcome, kind, actions = decide(org, it, team_slug, observed, due, reinvite)
+    if outcome == "reinvited":
+        observed = "invited"
+    return {"number": it.number, "author": it.author, "labels": list(it.labels), "updated_at": it.updated_at,
+            "member_state": observed, "outcome": outcome, "state": kind, "actions": actions}
+
+def decide(org, it, team_slug, observed, due, reinvite=True):
+    """(outcome, state update, actions) for an issue in the given membership state"""
+    author = it.author
+
+    # If not org member yet, remind (only while the invitation can be
+    # accepted) and keep open
+    if observed == "invited":
+        if due:
+            return "reminded", "remind", [
+                action("comment", body=f"@{author} 温馨提示：你还未加入 **@{org}**。请在这里接受邀请：\n\nhttps://github.com/orgs/{org}/invitation")]
+        return "waiting", "seen", []
+    if observed == "invite-expired" and it.has_label("invited") and due:
+        if not reinvite:
+            # Over this run's re-invite cap; still due next run
+            return "reinvite-held", "seen", []
+        return "reinvited", "remind", [
+            action("invite", login=author),
+            action("comment", body=f"@{author} 你之前的 **@{org}** 邀请已过期，已重新发送邀请，请在 7 天内接受：\n\n"
+                                   f"https://github.com/orgs/{org}/invitation")]
+    if observed in ("not-member", "invite-expired"):
+        return "waiting", "seen", []
 
-        close_issue(token, repo, issue_number)
+    # If needs team, ensure team membership; then comment + close
+    actions = []
+    if observed == "org-member":
+        actions.append(action("team-add", team=team_slug, login=author))
+    if team_slug:
+        actions.append(action("comment", body=f"@{author} ✅ 已确认你已加入 **@{org}** 并加入 **@{org}/{team_slug}**，本 Issue 将关闭。"))
+    else:
+        actions.append(action("comment", body=f"@{author} ✅ 已确认你已加入 **@{org}**，本 Issue 将关闭。"))
+    actions.append(action("close"))
+    return "closed", "forget", actions
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,77 @@
+import calendar
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+def utc_now():
+    # Same format as GitHub timestamps, so the two compare as strings
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+def hours_since(stamp):
+    if not stamp:
+        return float("inf")
+    then = calendar.timegm(time.strptime(stamp, "%Y-%m-%dT%H:%M:%SZ"))
+    return (time.time() - then) / 3600
+
+def shift_minutes(stamp, minutes):
+    t = calendar.timegm(time.strptime(stamp, "%Y-%m-%dT%H:%M:%SZ")) + minutes * 60
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(t))
+
+class ScanState:
+    """What the scanner last saw per issue, kept as a compact JSONL file.
+
+    Each line is {"number", "author", "labels", "updated_at", "member_state",
+    "reminded_at"}, plus one {"meta": {...}} line for run-level values such
+    as the last listing time. CI persists the file between runs so unchanged
+    issues can be skipped.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.records = {}
+        self.meta = {}
+        if self.path.exists():
+            for line in self.path.read_text(encoding="utf-8").splitlines():
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                if "meta" in rec:
+                    self.meta = rec["meta"]
+                else:
+                    self.records[rec["number"]] = rec
+
+    def get(self, number):
+        with self._lock:
+            return dict(self.records.get(number) or {})
+
+    def update(self, number, **fields):
+        with self._lock:
+            rec = self.records.setdefault(number, {"number": number})
+            rec.update(fields)
+
+    def numbers(self):
+        with self._lock:
+            return list(self.records)
+
+    def forget(self, number):
+        with self._lock:
+            self.records.pop(number, None)
+
+    def prune(self, keep):
+        """Forget issues that are no longer open"""
+        with self._lock:
+            for number in set(self.records) - set(keep):
+                del self.records[number]
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with self._lock:
+            lines = [json.dumps({"meta": self.meta}, sort_keys=True)] if self.meta else []
+            lines += [json.dumps(self.records[n], sort_keys=True) for n in sorted(self.records)]
+        tmp.write_text("\n".join(lines) + ("\n" if lines else ""), encoding="utf-8")
+        os.replace(tmp, self.path)